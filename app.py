@@ -4,24 +4,44 @@ Focus monitoring with clear state management
 """
 
 import os
+import hashlib
 import logging
 import time
 from datetime import datetime
+from threading import Lock
+from functools import wraps
 from flask import Flask, render_template, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.exceptions import HTTPException
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
 import cv2
 import sys
 import re
 import math
+import numpy as np
 from logging.handlers import RotatingFileHandler
 
+# Optional fast JSON encoder for API responses
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 # Import singleton state from state manager
 from state_manager import state
 
 # Import improved components
 from config_loader import config
-from improved_webcam_processor import ImprovedWebcamProcessor
+from improved_webcam_processor import (
+    ImprovedWebcamProcessor,
+    QUALITY_PRESETS,
+    VLM_AVAILABLE,
+    VLM_IMPORT_ERROR,
+)
 
 # Configure logging
 base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -31,25 +51,27 @@ if not os.path.exists(log_dir):
 
 
 class RedactFilter(logging.Filter):
-    def __init__(self):
-        super().__init__()
-        self.patterns = [
-            re.compile(r"(SECRET_KEY=)[^\\s]+", re.IGNORECASE),
-            re.compile(r"(EAGLEARN_ENCRYPTION_KEY=)[^\\s]+", re.IGNORECASE),
-            re.compile(
-                r"(api[_-]?key['\"]?\\s*[:=]\\s*['\"]?)[^'\"\\s]+", re.IGNORECASE
-            ),
-            re.compile(r"(token['\"]?\\s*[:=]\\s*['\"]?)[^'\"\\s]+", re.IGNORECASE),
-            re.compile(r"(password['\"]?\\s*[:=]\\s*['\"]?)[^'\"\\s]+", re.IGNORECASE),
-            re.compile(r"(Bearer\\s+)[A-Za-z0-9\\-\\._~\\+/]+=*", re.IGNORECASE),
-        ]
+    # Secret-bearing prefixes; the value after any of them is redacted
+    _PATTERN = re.compile(
+        r"(SECRET_KEY="
+        r"|EAGLEARN_ENCRYPTION_KEY="
+        r"|api[_-]?key['\"]?\s*[:=]\s*['\"]?"
+        r"|token['\"]?\s*[:=]\s*['\"]?"
+        r"|password['\"]?\s*[:=]\s*['\"]?"
+        r"|Bearer\s+)"
+        r"[^'\"\s]+",
+        re.IGNORECASE,
+    )
+    # Cheap substring pre-check so most records never reach the regex
+    _KEYWORDS = ("secret", "key", "token", "password", "bearer")
 
     def filter(self, record: logging.LogRecord) -> bool:
         try:
             msg = record.getMessage()
-            for p in self.patterns:
-                msg = p.sub(r"\\1[REDACTED]", msg)
-            record.msg = msg
+            lowered = msg.lower()
+            if not any(k in lowered for k in self._KEYWORDS):
+                return True
+            record.msg = self._PATTERN.sub(r"\1[REDACTED]", msg)
             record.args = ()
         except Exception:
             pass
@@ -82,21 +104,152 @@ def api_error(error_code, message, status=500, extra=None):
     return jsonify(payload), status
 
 
+class RequestFieldError(ValueError):
+    """A JSON body field could not be converted to its expected type"""
+
+
+def json_fields(*fields):
+    """Read (key, caster, default) fields from the JSON body in one pass.
+
+    Missing or null fields take the default; caster None passes the value
+    through. A value the caster rejects raises RequestFieldError.
+    """
+    # Decoded by app.json (orjson when available) and cached on the request
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    values = {}
+    for key, caster, default in fields:
+        value = data.get(key)
+        if value is None:
+            values[key] = default
+            continue
+        try:
+            values[key] = caster(value) if caster is not None else value
+        except (TypeError, ValueError):
+            raise RequestFieldError(f"Invalid value for {key}") from None
+    return values
+
+
+def api_route(error_code, action):
+    """Turn an unhandled route exception into a logged api_error 500"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except RequestFieldError as e:
+                return api_error("BAD_REQUEST", str(e), 400)
+            except HTTPException:
+                # 4xx aborts (413, 415, ...) go to the app's error handlers
+                raise
+            except Exception as e:
+                logger.error(f"Error {action}: {e}")
+                return api_error(error_code, str(e), 500)
+
+        return wrapper
+
+    return decorator
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (handles numpy scalars natively)"""
+
+    option = (
+        orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        if ORJSON_AVAILABLE
+        else 0
+    )
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype,
+        )
+
+
+class OrjsonSocketJSON:
+    """json-module shim so Socket.IO/Engine.IO packets are encoded by orjson"""
+
+    @staticmethod
+    def dumps(obj, **kwargs):
+        # separators/indent kwargs from the socketio packet encoder are moot:
+        # orjson output is always compact
+        return orjson.dumps(obj, option=OrjsonProvider.option).decode()
+
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
 # Initialize Flask app
 app = Flask(__name__)
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
+# Compact, unsorted JSON even in debug mode (Flask 2.3+ replaced the
+# JSONIFY_PRETTYPRINT_REGULAR / JSON_SORT_KEYS settings with these)
+app.json.compact = True
+app.json.sort_keys = False
+# "/api/state/" is served directly instead of via a 308 redirect round trip
+app.url_map.strict_slashes = False
+
+
+def _prebuilt_json(payload):
+    """Serialize a constant response payload once, at import"""
+    return app.json.dumps(payload).encode("utf-8")
+
+
+def json_bytes_response(body, status=200):
+    """Wrap a pre-encoded JSON body in a response"""
+    return app.response_class(body, status=status, mimetype=app.json.mimetype)
+
+
+_SESSION_STOPPED_BODY = _prebuilt_json(
+    {"status": "success", "message": "Session stopped"}
+)
+_CONFIG_RELOADED_BODY = _prebuilt_json(
+    {"status": "success", "message": "Configuration reloaded"}
+)
+_HEALTH_OK_BODY = _prebuilt_json({"status": "ok"})
+_NOT_FOUND_BODY = _prebuilt_json(
+    {"status": "error", "error_code": "NOT_FOUND", "message": "Not found"}
+)
+_SERVER_ERROR_BODY = _prebuilt_json(
+    {
+        "status": "error",
+        "error_code": "INTERNAL_ERROR",
+        "message": "Internal server error",
+    }
+)
 app.config["SECRET_KEY"] = os.getenv(
     "SECRET_KEY", "dev-secret-key-change-in-production"
 )
 app.config["TEMPLATES_AUTO_RELOAD"] = True
 app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 0
+# API bodies are small JSON; refuse anything larger before parsing it
+app.config["MAX_CONTENT_LENGTH"] = 2 * 1024 * 1024
+app.use_x_sendfile = bool(config.get("logging", "use_x_sendfile", default=False))
 CORS(app)
 # IMPORTANT: Use threading mode explicitly to handle background threads properly
+# Kept on "threading": the webcam pipeline and MediaPipe need real OS
+# threads, which eventlet/gevent monkey-patching would turn green. Clients
+# connect over WebSocket directly (served via simple-websocket)
 socketio = SocketIO(
     app,
     cors_allowed_origins="*",
     async_mode="threading",
     logger=False,
     engineio_logger=False,
+    # None keeps python-socketio's stdlib json default
+    json=OrjsonSocketJSON if ORJSON_AVAILABLE else None,
 )
 
 # ============================================================================
@@ -112,8 +265,54 @@ socketio = SocketIO(
 
 # Import improved modular webcam processor
 
-# Global webcam processor instance with socketio reference
-webcam = ImprovedWebcamProcessor(state, socketio=socketio)
+# Webcam processor singleton with socketio reference. Built on first use so
+# importing the app (tests, tooling, idle workers) does not load CV models
+_webcam = None
+_webcam_lock = Lock()
+# Socket.IO sids connected before the processor exists; handed to it when it
+# is built so opening the page alone does not load CV models
+_connected_sids = set()
+# Optional processor methods the REST routes call, resolved once when the
+# processor is built so each request skips hasattr()/getattr() probing
+_WEBCAM_HOOK_NAMES = (
+    "get_overlay_settings",
+    "set_overlay_settings",
+    "get_vlm_settings",
+    "set_vlm_enabled",
+)
+_webcam_hooks = {}
+
+
+def get_webcam():
+    """Return the processor, constructing it on first call"""
+    global _webcam
+    instance = _webcam
+    if instance is None:
+        with _webcam_lock:
+            if _webcam is None:
+                processor = ImprovedWebcamProcessor(state, socketio=socketio)
+                for sid in _connected_sids:
+                    processor.add_client(sid)
+                _webcam_hooks.update(
+                    (name, getattr(processor, name, None))
+                    for name in _WEBCAM_HOOK_NAMES
+                )
+                _webcam = processor
+            instance = _webcam
+    return instance
+
+
+def webcam_hook(name):
+    """Return a bound processor method, or None if it doesn't provide one"""
+    get_webcam()
+    return _webcam_hooks.get(name)
+
+
+def __getattr__(name):
+    # Keeps "from app import webcam" working for external scripts
+    if name == "webcam":
+        return get_webcam()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ============================================================================
 # FLASK ROUTES
@@ -126,294 +325,328 @@ def index():
     return render_template("index.html")
 
 
+# (snapshot, body): to_dict() hands back the same snapshot object until the
+# state changes, so the snapshot identity doubles as the cache version
+_state_json_cache = (None, b"")
+
+
+def state_json_response():
+    """JSON response for the current state, serialized once per change"""
+    global _state_json_cache
+    snapshot = state.to_dict()
+    cached_snapshot, body = _state_json_cache
+    if snapshot is not cached_snapshot:
+        body = app.json.dumps(snapshot).encode("utf-8")
+        _state_json_cache = (snapshot, body)
+    return app.response_class(body, mimetype=app.json.mimetype)
+
+
 @app.route("/api/state", methods=["GET"])
 def get_state():
     """Get current application state"""
-    return jsonify(state.to_dict())
+    return state_json_response()
 
 
-@app.route("/api/environment", methods=["GET"])
-def get_environment():
+# torch/tf/cv2 probes are costly and do not change while the process runs,
+# so they are taken once. CUDA_VISIBLE_DEVICES changes after the first
+# request are not picked up unless the caller passes ?refresh=1.
+_env_probe_cache = None
+_env_probe_lock = Lock()
+
+
+def _probe_environment():
+    """Import the ML backends once and record their GPU visibility"""
+    env = {}
+
     try:
-        env = {
-            "python_executable": sys.executable,
-            "gpu_enabled": bool(getattr(webcam, "gpu_enabled", False)),
-            "vlm_import_available": bool(
-                getattr(webcam, "vlm_service", None) is not None
-            ),
-        }
+        import torch
 
-        try:
-            import torch
+        env["torch_version"] = getattr(torch, "__version__", None)
+        env["torch_cuda_available"] = bool(torch.cuda.is_available())
+        env["torch_cuda_device_count"] = (
+            int(torch.cuda.device_count()) if env["torch_cuda_available"] else 0
+        )
+    except Exception as e:
+        env["torch_error"] = str(e)
 
-            env["torch_version"] = getattr(torch, "__version__", None)
-            env["torch_cuda_available"] = bool(torch.cuda.is_available())
-            env["torch_cuda_device_count"] = (
-                int(torch.cuda.device_count()) if torch.cuda.is_available() else 0
-            )
-        except Exception as e:
-            env["torch_error"] = str(e)
+    try:
+        import tensorflow as tf
 
-        try:
-            import tensorflow as tf
+        gpus = tf.config.list_physical_devices("GPU")
+        env["tf_version"] = getattr(tf, "__version__", None)
+        env["tf_gpu_count"] = len(gpus)
+    except Exception as e:
+        env["tf_error"] = str(e)
 
-            gpus = tf.config.list_physical_devices("GPU")
-            env["tf_version"] = getattr(tf, "__version__", None)
-            env["tf_gpu_count"] = len(gpus)
-        except Exception as e:
-            env["tf_error"] = str(e)
+    try:
+        env["opencv_version"] = cv2.__version__
+        env["opencv_cuda_device_count"] = (
+            int(cv2.cuda.getCudaEnabledDeviceCount()) if hasattr(cv2, "cuda") else 0
+        )
+    except Exception as e:
+        env["opencv_error"] = str(e)
 
-        try:
-            env["opencv_version"] = cv2.__version__
-            env["opencv_cuda_device_count"] = (
-                int(cv2.cuda.getCudaEnabledDeviceCount()) if hasattr(cv2, "cuda") else 0
-            )
-        except Exception as e:
-            env["opencv_error"] = str(e)
+    return env
 
-        try:
-            from improved_webcam_processor import VLM_AVAILABLE, VLM_IMPORT_ERROR
-
-            env["vlm_available_flag"] = bool(VLM_AVAILABLE)
-            env["vlm_import_error"] = VLM_IMPORT_ERROR
-            vlm_service = getattr(webcam, "vlm_service", None)
-            env["vlm_ready"] = bool(getattr(vlm_service, "is_ready", lambda: False)())
-            env["vlm_status"] = (
-                vlm_service.get_status()
-                if vlm_service and hasattr(vlm_service, "get_status")
-                else {"status": "disabled", "ready": False}
-            )
-        except Exception as e:
-            env["vlm_flag_error"] = str(e)
 
-        return jsonify(env), 200
+def get_environment_probes(refresh=False):
+    """Return the cached backend probes, running them on first use"""
+    global _env_probe_cache
+    if _env_probe_cache is None or refresh:
+        with _env_probe_lock:
+            if _env_probe_cache is None or refresh:
+                _env_probe_cache = _probe_environment()
+    return _env_probe_cache
+
+
+@app.route("/api/environment", methods=["GET"])
+@api_route("ENVIRONMENT_ERROR", "getting environment")
+def get_environment():
+    refresh = request.args.get("refresh") in ("1", "true")
+    # Don't build the processor just to describe it; until a session starts
+    # the GPU/VLM fields report as unavailable
+    webcam = _webcam
+    vlm_service = getattr(webcam, "vlm_service", None)
+    env = {
+        "python_executable": sys.executable,
+        "gpu_enabled": bool(getattr(webcam, "gpu_enabled", False)),
+        "vlm_import_available": vlm_service is not None,
+    }
+    env.update(get_environment_probes(refresh=refresh))
+
+    # VLM readiness changes at runtime, so it is read on every call
+    try:
+        env["vlm_available_flag"] = bool(VLM_AVAILABLE)
+        env["vlm_import_error"] = VLM_IMPORT_ERROR
+        env["vlm_ready"] = bool(getattr(vlm_service, "is_ready", lambda: False)())
+        env["vlm_status"] = (
+            vlm_service.get_status()
+            if vlm_service and hasattr(vlm_service, "get_status")
+            else {"status": "disabled", "ready": False}
+        )
     except Exception as e:
-        logger.error(f"Error getting environment: {e}")
-        return api_error("ENVIRONMENT_ERROR", str(e), 500)
+        env["vlm_flag_error"] = str(e)
+
+    return jsonify(env), 200
 
 
 @app.route("/api/session/start", methods=["POST"])
+@api_route("SESSION_START_ERROR", "starting session")
 def start_session():
     """Start a monitoring session"""
-    try:
-        with state.lock:
-            if state.is_running:
-                return jsonify(
-                    {
-                        "status": "success",
-                        "session_id": state.session_id,
-                        "message": "Session already running",
-                    }
-                ), 200
-
-            state.session_id = datetime.now().isoformat()
-            state.session_start_time = time.time()
-            state.is_running = True
-            state.focus_percentage = 50.0
-            state.focused_time_seconds = 0
-            state.unfocused_time_seconds = 0
-            state.distracted_events = 0
-
-            state.unfocus_intervals = []
-            state.unfocus_count = 0
-            state.first_unfocus_time = None
-            state.last_unfocus_time = None
-            state.current_unfocus_start = None
-            state.current_focus_start = time.time()
-
-            if hasattr(state, "last_status"):
-                state.last_status = "distracted"
-            if hasattr(state, "last_update_time"):
-                state.last_update_time = time.time()
-
-        if webcam.start():
+    # One clock read, taken before the lock; the id stays a readable
+    # timestamp because it also names the session's metrics log file
+    now = time.time()
+    session_id = datetime.fromtimestamp(now).isoformat()
+    with state.lock:
+        if state.is_running:
             return jsonify(
                 {
                     "status": "success",
                     "session_id": state.session_id,
-                    "message": "Session started",
+                    "message": "Session already running",
                 }
             ), 200
-        else:
-            with state.lock:
-                state.is_running = False
-            return api_error("WEBCAM_START_FAILED", "Failed to start webcam", 500)
-    except Exception as e:
-        logger.error(f"Error starting session: {e}")
-        return api_error("SESSION_START_ERROR", str(e), 500)
+
+        state.session_id = session_id
+        state.session_start_time = now
+        state.is_running = True
+        state.focus_percentage = 50.0
+        state.focused_time_seconds = 0
+        state.unfocused_time_seconds = 0
+        state.distracted_events = 0
+
+        state.unfocus_intervals = []
+        state.unfocus_count = 0
+        state.first_unfocus_time = None
+        state.last_unfocus_time = None
+        state.current_unfocus_start = None
+        state.current_focus_start = now
+
+    if get_webcam().start():
+        return jsonify(
+            {
+                "status": "success",
+                "session_id": state.session_id,
+                "message": "Session started",
+            }
+        ), 200
+    else:
+        with state.lock:
+            state.is_running = False
+        return api_error("WEBCAM_START_FAILED", "Failed to start webcam", 500)
 
 
 @app.route("/api/session/stop", methods=["POST"])
+@api_route("SESSION_STOP_ERROR", "stopping session")
 def stop_session():
     """Stop monitoring session"""
-    try:
-        webcam.stop()
-        with state.lock:
-            state.is_running = False
-            state.calibration_in_progress = False
+    get_webcam().stop()
+    with state.lock:
+        state.is_running = False
+        state.calibration_in_progress = False
 
-        return jsonify({"status": "success", "message": "Session stopped"}), 200
-    except Exception as e:
-        logger.error(f"Error stopping session: {e}")
-        return api_error("SESSION_STOP_ERROR", str(e), 500)
+    return json_bytes_response(_SESSION_STOPPED_BODY)
 
 
 @app.route("/api/metrics", methods=["GET"])
 def get_metrics():
     """Get current metrics"""
-    return jsonify(state.to_dict())
+    return state_json_response()
 
 
 @app.route("/api/quality", methods=["POST"])
+@api_route("QUALITY_SET_ERROR", "setting quality")
 def set_quality():
-    try:
-        data = request.get_json(silent=True) or {}
-        preset = (data.get("preset") or "").strip().lower()
-        if preset not in ("low", "balanced", "high"):
-            return api_error(
-                "BAD_REQUEST", "Invalid preset. Use low|balanced|high", 400
-            )
-        webcam.set_quality_preset(preset)
-        return jsonify({"status": "success", "preset": preset}), 200
-    except Exception as e:
-        logger.error(f"Error setting quality: {e}")
-        return api_error("QUALITY_SET_ERROR", str(e), 500)
+    preset = json_fields(("preset", str, ""))["preset"].strip().lower()
+    if preset not in QUALITY_PRESETS:
+        return api_error(
+            "BAD_REQUEST", "Invalid preset. Use low|balanced|high", 400
+        )
+    get_webcam().set_quality_preset(preset)
+    return jsonify({"status": "success", "preset": preset}), 200
 
 
 @app.route("/api/ui/overlay", methods=["GET"])
+@api_route("OVERLAY_GET_ERROR", "getting overlay settings")
 def get_overlay_settings():
-    try:
-        overlay = (
-            webcam.get_overlay_settings()
-            if hasattr(webcam, "get_overlay_settings")
-            else {}
-        )
-        return jsonify({"status": "success", "overlay": overlay}), 200
-    except Exception as e:
-        logger.error(f"Error getting overlay settings: {e}")
-        return api_error("OVERLAY_GET_ERROR", str(e), 500)
+    get_overlay = webcam_hook("get_overlay_settings")
+    overlay = get_overlay() if get_overlay else {}
+    return jsonify({"status": "success", "overlay": overlay}), 200
 
 
 @app.route("/api/ui/overlay", methods=["POST"])
+@api_route("OVERLAY_SET_ERROR", "setting overlay settings")
 def set_overlay_settings():
-    try:
-        data = request.get_json(silent=True) or {}
-        show_face_mesh = data.get("show_face_mesh", None)
-        face_mesh_alpha = data.get("face_mesh_alpha", None)
-        face_mesh_smoothing = data.get("face_mesh_smoothing", None)
-        face_mesh_mode = data.get("face_mesh_mode", None)
-        face_mesh_stride = data.get("face_mesh_stride", None)
-
-        if (
-            show_face_mesh is None
-            and isinstance(data.get("toggle"), bool)
-            and data.get("toggle")
-        ):
-            current = (
-                webcam.get_overlay_settings()
-                if hasattr(webcam, "get_overlay_settings")
-                else {}
-            )
-            show_face_mesh = not bool(current.get("show_face_mesh"))
-
-        if hasattr(webcam, "set_overlay_settings"):
-            webcam.set_overlay_settings(
-                show_face_mesh=show_face_mesh,
-                face_mesh_alpha=face_mesh_alpha,
-                face_mesh_smoothing=face_mesh_smoothing,
-                face_mesh_mode=face_mesh_mode,
-                face_mesh_stride=face_mesh_stride,
-            )
-
-        overlay = (
-            webcam.get_overlay_settings()
-            if hasattr(webcam, "get_overlay_settings")
-            else {}
+    # The processor validates the overlay values itself, so they pass through
+    fields = json_fields(
+        ("show_face_mesh", None, None),
+        ("face_mesh_alpha", None, None),
+        ("face_mesh_smoothing", None, None),
+        ("face_mesh_mode", None, None),
+        ("face_mesh_stride", None, None),
+        ("toggle", None, False),
+    )
+    show_face_mesh = fields["show_face_mesh"]
+    get_overlay = webcam_hook("get_overlay_settings")
+    set_overlay = webcam_hook("set_overlay_settings")
+
+    if show_face_mesh is None and fields["toggle"] is True:
+        current = get_overlay() if get_overlay else {}
+        show_face_mesh = not bool(current.get("show_face_mesh"))
+
+    overlay = None
+    if set_overlay:
+        overlay = set_overlay(
+            show_face_mesh=show_face_mesh,
+            face_mesh_alpha=fields["face_mesh_alpha"],
+            face_mesh_smoothing=fields["face_mesh_smoothing"],
+            face_mesh_mode=fields["face_mesh_mode"],
+            face_mesh_stride=fields["face_mesh_stride"],
         )
-        return jsonify({"status": "success", "overlay": overlay}), 200
-    except Exception as e:
-        logger.error(f"Error setting overlay settings: {e}")
-        return api_error("OVERLAY_SET_ERROR", str(e), 500)
+
+    if overlay is None:
+        overlay = get_overlay() if get_overlay else {}
+    return jsonify({"status": "success", "overlay": overlay}), 200
 
 
 @app.route("/api/vlm/settings", methods=["GET"])
+@api_route("VLM_GET_ERROR", "getting VLM settings")
 def get_vlm_settings():
-    try:
-        if hasattr(webcam, "get_vlm_settings"):
-            vlm = webcam.get_vlm_settings()
-        else:
-            vlm = {
-                "user_enabled": False,
-                "status": getattr(state, "vlm_status", "disabled"),
-                "ready": bool(getattr(state, "vlm_ready", False)),
-                "last_error": getattr(state, "vlm_last_error", None),
-            }
-        return jsonify({"status": "success", "vlm": vlm}), 200
-    except Exception as e:
-        logger.error(f"Error getting VLM settings: {e}")
-        return api_error("VLM_GET_ERROR", str(e), 500)
+    get_vlm = webcam_hook("get_vlm_settings")
+    if get_vlm:
+        vlm = get_vlm()
+    else:
+        vlm = {
+            "user_enabled": False,
+            "status": getattr(state, "vlm_status", "disabled"),
+            "ready": bool(getattr(state, "vlm_ready", False)),
+            "last_error": getattr(state, "vlm_last_error", None),
+        }
+    return jsonify({"status": "success", "vlm": vlm}), 200
 
 
 @app.route("/api/vlm/settings", methods=["POST"])
+@api_route("VLM_SET_ERROR", "setting VLM settings")
 def set_vlm_settings():
-    try:
-        data = request.get_json(silent=True) or {}
-        enabled = data.get("enabled", None)
-        toggle = bool(data.get("toggle", False))
-        if toggle:
-            current = (
-                webcam.get_vlm_settings() if hasattr(webcam, "get_vlm_settings") else {}
-            )
-            enabled = not bool(current.get("user_enabled", False))
-        if enabled is None:
-            return api_error("BAD_REQUEST", "Missing enabled or toggle", 400)
-        vlm = (
-            webcam.set_vlm_enabled(bool(enabled))
-            if hasattr(webcam, "set_vlm_enabled")
-            else None
-        )
-        if not vlm:
-            vlm = {
-                "user_enabled": bool(enabled),
-                "status": getattr(state, "vlm_status", "disabled"),
-                "ready": bool(getattr(state, "vlm_ready", False)),
-                "last_error": getattr(state, "vlm_last_error", None),
-            }
-        return jsonify({"status": "success", "vlm": vlm}), 200
-    except Exception as e:
-        logger.error(f"Error setting VLM settings: {e}")
-        return api_error("VLM_SET_ERROR", str(e), 500)
+    fields = json_fields(("enabled", None, None), ("toggle", bool, False))
+    enabled = fields["enabled"]
+    if fields["toggle"]:
+        get_vlm = webcam_hook("get_vlm_settings")
+        current = get_vlm() if get_vlm else {}
+        enabled = not bool(current.get("user_enabled", False))
+    if enabled is None:
+        return api_error("BAD_REQUEST", "Missing enabled or toggle", 400)
+    set_vlm_enabled = webcam_hook("set_vlm_enabled")
+    vlm = set_vlm_enabled(bool(enabled)) if set_vlm_enabled else None
+    if not vlm:
+        vlm = {
+            "user_enabled": bool(enabled),
+            "status": getattr(state, "vlm_status", "disabled"),
+            "ready": bool(getattr(state, "vlm_ready", False)),
+            "last_error": getattr(state, "vlm_last_error", None),
+        }
+    return jsonify({"status": "success", "vlm": vlm}), 200
 
 
 @app.route("/api/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok"}), 200
+    # A fresh response around shared bytes: flask-cors and other after-request
+    # hooks mutate headers, so one Response object can't be reused
+    return json_bytes_response(_HEALTH_OK_BODY)
 
 
 @app.route("/api/logs/metrics/download", methods=["GET"])
+@api_route("METRICS_LOG_DOWNLOAD_ERROR", "downloading metrics log")
 def download_metrics_log():
-    try:
-        path = webcam.get_metrics_log_path()
-        if not path or not os.path.exists(path):
-            return api_error(
-                "METRICS_LOG_NOT_AVAILABLE",
-                "Metrics log belum tersedia. Mulai sesi dulu.",
-                404,
-            )
-
-        filename = os.path.basename(path)
-        return send_file(
-            path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype="application/jsonl",
+    webcam = get_webcam()
+    path = webcam.get_metrics_log_path()
+    if not path or not os.path.exists(path):
+        return api_error(
+            "METRICS_LOG_NOT_AVAILABLE",
+            "Metrics log belum tersedia. Mulai sesi dulu.",
+            404,
         )
-    except Exception as e:
-        logger.error(f"Error downloading metrics log: {e}")
-        return api_error("METRICS_LOG_DOWNLOAD_ERROR", str(e), 500)
+
+    # Records are buffered between interval flushes; serve whole lines
+    webcam.flush_metrics_log()
+
+    filename = os.path.basename(path)
+    accel_prefix = config.get("logging", "x_accel_redirect_prefix", default="")
+    if accel_prefix:
+        # nginx streams the file itself from its internal location
+        response = app.response_class(mimetype="application/jsonl")
+        response.headers["X-Accel-Redirect"] = accel_prefix.rstrip("/") + "/" + filename
+        response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    # Conditional: serves Range / If-None-Match / If-Modified-Since so large
+    # logs can resume, and lets the WSGI server use sendfile for the body
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=filename,
+        mimetype="application/jsonl",
+        conditional=True,
+        etag=True,
+        last_modified=os.path.getmtime(path),
+    )
+
+
+def format_duration(seconds):
+    """Format seconds as "Xm Ys" for display ("N/A" when unknown)"""
+    if seconds is None:
+        return "N/A"
+    seconds = int(seconds)
+    return f"{seconds // 60}m {seconds % 60}s"
+
+
+# (key, formatted analytics without the rate) for get_unfocus_analytics
+_unfocus_payload_cache = (None, None)
 
 
 @app.route("/api/analytics/unfocus", methods=["GET"])
+@api_route("ANALYTICS_ERROR", "calculating unfocus analytics")
 def get_unfocus_analytics():
     """
     ENHANCED: Get detailed unfocus analytics (GazeRecorder-style)
@@ -424,158 +657,142 @@ def get_unfocus_analytics():
     - Common unfocus reasons
     - Recent unfocus intervals
     """
-    try:
-        analytics = webcam.calculate_unfocus_analytics()
-
-        # Format times for display
-        def format_duration(seconds):
-            if seconds is None:
-                return "N/A"
-            mins = int(seconds // 60)
-            secs = int(seconds % 60)
-            return f"{mins}m {secs}s"
+    global _unfocus_payload_cache
+    analytics = get_webcam().calculate_unfocus_analytics()
+
+    # recent_intervals is the same list object until an interval closes, so
+    # the formatted fields are rebuilt only then; the rate moves every call
+    key = (
+        analytics["recent_intervals"],
+        analytics["unfocus_count"],
+        analytics["time_to_first_unfocus"],
+    )
+    cached_key, formatted = _unfocus_payload_cache
+    if (
+        cached_key is None
+        or key[0] is not cached_key[0]
+        or key[1:] != cached_key[1:]
+    ):
+        formatted = {
+            "unfocus_count": analytics["unfocus_count"],
+            "total_unfocus_time": analytics["total_duration"],
+            "total_unfocus_time_formatted": format_duration(
+                analytics["total_duration"]
+            ),
+            "avg_duration": round(analytics["avg_duration"], 1),
+            "avg_duration_formatted": format_duration(analytics["avg_duration"]),
+            "min_duration": round(analytics["min_duration"], 1),
+            "max_duration": round(analytics["max_duration"], 1),
+            "time_to_first_unfocus": round(analytics["time_to_first_unfocus"], 1)
+            if analytics["time_to_first_unfocus"]
+            else None,
+            "time_to_first_unfocus_formatted": format_duration(
+                analytics["time_to_first_unfocus"]
+            ),
+            "unfocus_rate_per_hour": None,
+            "common_reasons": analytics["common_reasons"],
+            "recent_intervals": analytics["recent_intervals"],
+        }
+        _unfocus_payload_cache = (key, formatted)
 
-        return jsonify(
-            {
-                "status": "success",
-                "analytics": {
-                    "unfocus_count": analytics["unfocus_count"],
-                    "total_unfocus_time": analytics["total_duration"],
-                    "total_unfocus_time_formatted": format_duration(
-                        analytics["total_duration"]
-                    ),
-                    "avg_duration": round(analytics["avg_duration"], 1),
-                    "avg_duration_formatted": format_duration(
-                        analytics["avg_duration"]
-                    ),
-                    "min_duration": round(analytics["min_duration"], 1),
-                    "max_duration": round(analytics["max_duration"], 1),
-                    "time_to_first_unfocus": round(
-                        analytics["time_to_first_unfocus"], 1
-                    )
-                    if analytics["time_to_first_unfocus"]
-                    else None,
-                    "time_to_first_unfocus_formatted": format_duration(
-                        analytics["time_to_first_unfocus"]
-                    ),
-                    "unfocus_rate_per_hour": analytics["unfocus_rate"],
-                    "common_reasons": analytics["common_reasons"],
-                    "recent_intervals": [
-                        {
-                            "start": interval["start"],
-                            "end": interval["end"],
-                            "duration": round(interval["duration"], 1),
-                            "reason": interval["reason"],
-                        }
-                        for interval in analytics["recent_intervals"]
-                    ],
-                },
-            }
-        ), 200
-    except Exception as e:
-        logger.error(f"Error calculating unfocus analytics: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    payload = dict(formatted)
+    payload["unfocus_rate_per_hour"] = analytics["unfocus_rate"]
+    return jsonify({"status": "success", "analytics": payload}), 200
 
 
 @app.route("/api/calibration/start", methods=["POST"])
+@api_route("CALIBRATION_START_ERROR", "starting calibration")
 def start_calibration():
     """Start calibration session"""
-    try:
-        data = request.get_json() or {}
-        user_id = data.get("user_id", "default")
+    user_id = json_fields(("user_id", str, "default"))["user_id"]
 
-        webcam.calibration.start_calibration(user_id)
+    get_webcam().calibration.start_calibration(user_id)
 
-        return jsonify(
-            {"status": "success", "message": f"Calibration started for user: {user_id}"}
-        ), 200
-    except Exception as e:
-        logger.error(f"Error starting calibration: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify(
+        {"status": "success", "message": f"Calibration started for user: {user_id}"}
+    ), 200
 
 
 @app.route("/api/calibration/add-point", methods=["POST"])
+@api_route("CALIBRATION_POINT_ERROR", "adding calibration point")
 def add_calibration_point():
     """Add a calibration point"""
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"status": "error", "message": "No data provided"}), 400
-
-        webcam.calibration.add_calibration_point(
-            screen_x=data.get("screen_x", 0),
-            screen_y=data.get("screen_y", 0),
-            gaze_x=data.get("gaze_x", 0),
-            gaze_y=data.get("gaze_y", 0),
-        )
+    if not request.get_json(silent=True):
+        return jsonify({"status": "error", "message": "No data provided"}), 400
+
+    point = json_fields(
+        ("screen_x", int, 0),
+        ("screen_y", int, 0),
+        ("gaze_x", float, 0.0),
+        ("gaze_y", float, 0.0),
+    )
+    get_webcam().calibration.add_calibration_point(**point)
 
-        return jsonify({"status": "success"}), 200
-    except Exception as e:
-        logger.error(f"Error adding calibration point: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"status": "success"}), 200
 
 
 @app.route("/api/calibration/calculate", methods=["POST"])
+@api_route("CALIBRATION_CALCULATE_ERROR", "calculating calibration")
 def calculate_calibration():
     """Calculate and save calibration"""
-    try:
-        calibration_data = webcam.calibration.calculate_calibration()
+    calibration_data = get_webcam().calibration.calculate_calibration()
 
-        return jsonify({"status": "success", "calibration": calibration_data}), 200
-    except Exception as e:
-        logger.error(f"Error calculating calibration: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"status": "success", "calibration": calibration_data}), 200
 
 
 @app.route("/api/calibration/status", methods=["GET"])
+@api_route("CALIBRATION_STATUS_ERROR", "getting calibration status")
 def get_calibration_status():
     """Get calibration status"""
-    try:
-        status = webcam.calibration.get_calibration_status()
-        return jsonify(status), 200
-    except Exception as e:
-        logger.error(f"Error getting calibration status: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    status = get_webcam().calibration.get_calibration_status()
+    return jsonify(status), 200
 
 
 @app.route("/api/privacy/toggle", methods=["POST"])
+@api_route("PRIVACY_TOGGLE_ERROR", "toggling privacy")
 def toggle_privacy():
     """Toggle privacy mode (pause/resume processing)"""
-    try:
-        is_enabled = webcam.toggle_processing()
+    is_enabled = get_webcam().toggle_processing()
 
-        return jsonify(
-            {
-                "status": "success",
-                "processing_enabled": is_enabled,
-                "message": "Processing resumed" if is_enabled else "Processing paused",
-            }
-        ), 200
-    except Exception as e:
-        logger.error(f"Error toggling privacy: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify(
+        {
+            "status": "success",
+            "processing_enabled": is_enabled,
+            "message": "Processing resumed" if is_enabled else "Processing paused",
+        }
+    ), 200
 
 
 @app.route("/api/config/reload", methods=["POST"])
+@api_route("CONFIG_RELOAD_ERROR", "reloading config")
 def reload_config():
     """Reload configuration from file"""
-    try:
-        config.reload()
+    config.reload()
 
-        return jsonify({"status": "success", "message": "Configuration reloaded"}), 200
-    except Exception as e:
-        logger.error(f"Error reloading config: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    return json_bytes_response(_CONFIG_RELOADED_BODY)
+
+
+# (config dict, body, etag): config.reload() swaps in a new dict, so the dict
+# identity tells us when the cached body is stale
+_config_json_cache = (None, b"", "")
 
 
 @app.route("/api/config", methods=["GET"])
+@api_route("CONFIG_GET_ERROR", "getting config")
 def get_config():
     """Get current configuration"""
-    try:
-        return jsonify(config.config), 200
-    except Exception as e:
-        logger.error(f"Error getting config: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+    global _config_json_cache
+    cfg = config.config
+    cached_cfg, body, etag = _config_json_cache
+    if cfg is not cached_cfg:
+        body = app.json.dumps(cfg).encode("utf-8")
+        etag = hashlib.md5(body, usedforsecurity=False).hexdigest()
+        _config_json_cache = (cfg, body, etag)
+
+    response = app.response_class(body, mimetype=app.json.mimetype)
+    response.set_etag(etag)
+    # Answers If-None-Match with an empty 304
+    return response.make_conditional(request)
 
 
 # ============================================================================
@@ -586,14 +803,24 @@ def get_config():
 @socketio.on("connect")
 def handle_connect():
     """Handle client connection"""
-    logger.info(f"Client connected: {request.sid}")
+    logger.info("Client connected: %s", request.sid)
+    with _webcam_lock:
+        _connected_sids.add(request.sid)
+        webcam = _webcam
+    if webcam is not None:
+        webcam.add_client(request.sid)
     emit("connection_response", {"status": "connected"})
 
 
 @socketio.on("disconnect")
 def handle_disconnect():
     """Handle client disconnection"""
-    logger.info(f"Client disconnected: {request.sid}")
+    logger.info("Client disconnected: %s", request.sid)
+    with _webcam_lock:
+        _connected_sids.discard(request.sid)
+        webcam = _webcam
+    if webcam is not None:
+        webcam.remove_client(request.sid)
 
 
 @socketio.on("request_state")
@@ -613,7 +840,7 @@ def handle_calibration_start():
     logger.info("Calibration started")
 
     # Ensure webcam is running
-    if not webcam.start():
+    if not get_webcam().start():
         logger.error("Failed to start webcam for calibration")
         emit("calibration_error", {"error": "Failed to start camera"})
         return
@@ -631,244 +858,286 @@ def handle_calibration_start():
     emit("calibration_started", {"status": "ok"})
 
 
-@socketio.on("calibration_complete")
-def handle_calibration_complete(data):
-    """Handle calibration complete - save calibration data"""
-    try:
-        gaze_data = data.get("data", [])
-        head_samples = data.get("head_samples", []) or []
-
-        if not gaze_data or len(gaze_data) < 9:
-            logger.warning("[WARN] Insufficient calibration data")
-            emit("calibration_error", {"error": "Insufficient data"})
-            return
+# One calibration fit/save at a time: runs share the processor's calibration
+_calibration_lock = Lock()
 
-        user_id = "default"
-        webcam.calibration.start_calibration(user_id)
-
-        viewport = data.get("viewport", {})
-        viewport_width = int(viewport.get("width", 1920) or 1920)
-        viewport_height = int(viewport.get("height", 1080) or 1080)
-
-        sample_count = 0
-        for point_data in gaze_data:
-            point = point_data.get("point", {})
-            screen_x = point.get("screen_x")
-            screen_y = point.get("screen_y")
-
-            if screen_x is None or screen_y is None:
-                x_pct = float(point.get("x", 50)) / 100.0
-                y_pct = float(point.get("y", 50)) / 100.0
-                screen_x = int(x_pct * viewport_width)
-                screen_y = int(y_pct * viewport_height)
-
-            samples = point_data.get("samples", [])
-            for s in samples:
-                gaze_x = s.get("x")
-                gaze_y = s.get("y")
-                if gaze_x is None or gaze_y is None:
-                    continue
-                webcam.calibration.add_calibration_point(
-                    screen_x=int(screen_x),
-                    screen_y=int(screen_y),
-                    gaze_x=float(gaze_x),
-                    gaze_y=float(gaze_y),
-                )
-                sample_count += 1
 
-        if sample_count < 4:
-            logger.warning(
-                "[WARN] Calibration complete but insufficient gaze samples were captured"
+def _complete_calibration(sid, data, gaze_data, head_samples, max_samples):
+    """Fit and save calibration in the background, then notify the client"""
+    try:
+        with _calibration_lock:
+            user_id = "default"
+            get_webcam().calibration.start_calibration(user_id)
+
+            viewport = data.get("viewport", {})
+            viewport_width = int(viewport.get("width", 1920) or 1920)
+            viewport_height = int(viewport.get("height", 1080) or 1080)
+
+            # Gather every sample into two arrays and hand them over at once
+            capacity = sum(
+                len(point_data.get("samples", [])[:max_samples])
+                for point_data in gaze_data
             )
-            emit(
-                "calibration_error",
-                {
-                    "error": "Insufficient gaze samples captured. Ensure face is detected and keep eyes visible during calibration."
-                },
+            screens = np.empty((capacity, 2), dtype=np.int64)
+            gazes = np.empty((capacity, 2), dtype=np.float64)
+            sample_count = 0
+            for point_data in gaze_data:
+                point = point_data.get("point", {})
+                screen_x = point.get("screen_x")
+                screen_y = point.get("screen_y")
+
+                if screen_x is None or screen_y is None:
+                    x_pct = float(point.get("x", 50)) / 100.0
+                    y_pct = float(point.get("y", 50)) / 100.0
+                    screen_x = int(x_pct * viewport_width)
+                    screen_y = int(y_pct * viewport_height)
+                screen = (int(screen_x), int(screen_y))
+
+                samples = point_data.get("samples", [])[:max_samples]
+                for s in samples:
+                    gaze_x = s.get("x")
+                    gaze_y = s.get("y")
+                    if gaze_x is None or gaze_y is None:
+                        continue
+                    screens[sample_count] = screen
+                    gazes[sample_count] = (float(gaze_x), float(gaze_y))
+                    sample_count += 1
+
+            get_webcam().calibration.add_calibration_points(
+                screens[:sample_count], gazes[:sample_count]
             )
-            return
 
-        calibration_data = webcam.calibration.calculate_calibration()
-
-        # Override screen size with actual viewport used for calibration
-        calibration_data["screen_width"] = viewport_width
-        calibration_data["screen_height"] = viewport_height
+            if sample_count < 4:
+                logger.warning(
+                    "[WARN] Calibration complete but insufficient gaze samples were captured"
+                )
+                socketio.emit(
+                    "calibration_error",
+                    {
+                        "error": "Insufficient gaze samples captured. Ensure face is detected and keep eyes visible during calibration."
+                    },
+                    to=sid,
+                )
+                return
+
+            # Saved once below, after the viewport and head fields are merged in
+            calibration_data = get_webcam().calibration.calculate_calibration(save=False)
+
+            # Override screen size with actual viewport used for calibration
+            calibration_data["screen_width"] = viewport_width
+            calibration_data["screen_height"] = viewport_height
+
+            def _safe_float(v):
+                if isinstance(v, float):
+                    return v
+                try:
+                    if v is None:
+                        return None
+                    return float(v)
+                except Exception:
+                    return None
 
-        def _safe_float(v):
-            try:
-                if v is None:
+            def _median(values):
+                values = [v for v in values if isinstance(v, (int, float))]
+                if not values:
                     return None
-                return float(v)
-            except Exception:
-                return None
-
-        def _median(values):
-            values = [v for v in values if isinstance(v, (int, float))]
-            if not values:
-                return None
-            values = sorted(values)
-            mid = len(values) // 2
-            if len(values) % 2 == 1:
-                return float(values[mid])
-            return float((values[mid - 1] + values[mid]) / 2.0)
-
-        def _linear_slope(x, y):
-            if not x or not y or len(x) != len(y):
-                return None, None
-            if len(x) < 8:
-                return None, None
-            x_mean = sum(x) / len(x)
-            y_mean = sum(y) / len(y)
-            sxx = 0.0
-            sxy = 0.0
-            for xi, yi in zip(x, y):
-                dx = xi - x_mean
-                dy = yi - y_mean
-                sxx += dx * dx
-                sxy += dx * dy
-            if sxx <= 1e-9:
-                return None, None
-            slope = sxy / sxx
-            sse = 0.0
-            sst = 0.0
-            for xi, yi in zip(x, y):
-                pred = y_mean + slope * (xi - x_mean)
-                err = yi - pred
-                sse += err * err
-                dy = yi - y_mean
-                sst += dy * dy
-            r2 = None
-            if sst > 1e-9:
-                r2 = 1.0 - (sse / sst)
-            return float(slope), (float(r2) if r2 is not None else None)
-
-        baseline_yaw = None
-        baseline_pitch = None
-        baseline_face_scale = None
-        if isinstance(head_samples, list) and head_samples:
-            center = [s for s in head_samples if isinstance(s, dict) and s.get("step") == "center"]
+                return float(np.median(values))
+
+            def _linear_slope(x, y):
+                if len(x) != len(y) or len(x) < 8:
+                    return None, None
+                x = np.asarray(x, dtype=np.float64)
+                y = np.asarray(y, dtype=np.float64)
+                dx = x - x.mean()
+                dy = y - y.mean()
+                sxx = float(dx @ dx)
+                if sxx <= 1e-9:
+                    return None, None
+                slope = float(dx @ dy) / sxx
+                err = dy - slope * dx
+                sse = float(err @ err)
+                sst = float(dy @ dy)
+                r2 = None
+                if sst > 1e-9:
+                    r2 = 1.0 - (sse / sst)
+                return float(slope), (float(r2) if r2 is not None else None)
+
+            # One pass partitions the head samples by calibration step
             center_yaw_vals = []
             center_pitch_vals = []
             center_scale_vals = []
-            for s in center:
-                yv = _safe_float(s.get("head_yaw"))
-                pv = _safe_float(s.get("head_pitch"))
-                sv = _safe_float(s.get("face_scale"))
-                if yv is not None:
-                    center_yaw_vals.append(yv)
-                if pv is not None:
-                    center_pitch_vals.append(pv)
-                if sv is not None:
-                    center_scale_vals.append(sv)
+            yaw_head = []
+            yaw_gaze = []
+            pitch_head = []
+            pitch_gaze = []
+            if isinstance(head_samples, list):
+                for s in head_samples:
+                    if not isinstance(s, dict):
+                        continue
+                    step = s.get("step")
+                    if step == "center":
+                        yv = _safe_float(s.get("head_yaw"))
+                        pv = _safe_float(s.get("head_pitch"))
+                        sv = _safe_float(s.get("face_scale"))
+                        if yv is not None:
+                            center_yaw_vals.append(yv)
+                        if pv is not None:
+                            center_pitch_vals.append(pv)
+                        if sv is not None:
+                            center_scale_vals.append(sv)
+                    elif step == "yaw":
+                        hy = _safe_float(s.get("head_yaw"))
+                        gx = _safe_float(s.get("gaze_x"))
+                        if hy is not None and gx is not None:
+                            yaw_head.append(hy)
+                            yaw_gaze.append(gx)
+                    elif step == "pitch":
+                        hp = _safe_float(s.get("head_pitch"))
+                        gy = _safe_float(s.get("gaze_y"))
+                        if hp is not None and gy is not None:
+                            pitch_head.append(hp)
+                            pitch_gaze.append(gy)
+
             baseline_yaw = _median(center_yaw_vals)
             baseline_pitch = _median(center_pitch_vals)
             baseline_face_scale = _median(center_scale_vals)
 
-        yaw_gain = None
-        pitch_gain = None
-        yaw_r2 = None
-        pitch_r2 = None
-        if baseline_yaw is not None and isinstance(head_samples, list) and head_samples:
-            yaw_step = [s for s in head_samples if isinstance(s, dict) and s.get("step") == "yaw"]
-            xs = []
-            ys = []
-            for s in yaw_step:
-                hy = _safe_float(s.get("head_yaw"))
-                gx = _safe_float(s.get("gaze_x"))
-                if hy is None or gx is None:
-                    continue
-                xs.append(hy - baseline_yaw)
-                ys.append(gx)
-            slope, r2 = _linear_slope(xs, ys)
-            if slope is not None:
-                yaw_gain = float(max(-0.03, min(0.03, slope)))
-                yaw_r2 = r2
-
-        if baseline_pitch is not None and isinstance(head_samples, list) and head_samples:
-            pitch_step = [s for s in head_samples if isinstance(s, dict) and s.get("step") == "pitch"]
-            xs = []
-            ys = []
-            for s in pitch_step:
-                hp = _safe_float(s.get("head_pitch"))
-                gy = _safe_float(s.get("gaze_y"))
-                if hp is None or gy is None:
-                    continue
-                xs.append(hp - baseline_pitch)
-                ys.append(gy)
-            slope, r2 = _linear_slope(xs, ys)
-            if slope is not None:
-                pitch_gain = float(max(-0.03, min(0.03, slope)))
-                pitch_r2 = r2
-
-        if baseline_yaw is not None:
-            calibration_data["head_baseline_yaw"] = float(baseline_yaw)
-        if baseline_pitch is not None:
-            calibration_data["head_baseline_pitch"] = float(baseline_pitch)
-        if yaw_gain is not None:
-            calibration_data["head_compensation_yaw_gain"] = float(yaw_gain)
-            if yaw_r2 is not None and not math.isnan(yaw_r2):
-                calibration_data["head_compensation_yaw_r2"] = float(yaw_r2)
-        if pitch_gain is not None:
-            calibration_data["head_compensation_pitch_gain"] = float(pitch_gain)
-            if pitch_r2 is not None and not math.isnan(pitch_r2):
-                calibration_data["head_compensation_pitch_r2"] = float(pitch_r2)
-
-        if baseline_face_scale is not None:
-            calibration_data["face_scale_baseline"] = float(baseline_face_scale)
-
-        # Ensure calibration is persisted even if auto_save is disabled
-        webcam.calibration.save_calibration(user_id)
+            yaw_gain = None
+            pitch_gain = None
+            yaw_r2 = None
+            pitch_r2 = None
+            if baseline_yaw is not None:
+                slope, r2 = _linear_slope(
+                    np.asarray(yaw_head, dtype=np.float64) - baseline_yaw, yaw_gaze
+                )
+                if slope is not None:
+                    yaw_gain = float(max(-0.03, min(0.03, slope)))
+                    yaw_r2 = r2
+
+            if baseline_pitch is not None:
+                slope, r2 = _linear_slope(
+                    np.asarray(pitch_head, dtype=np.float64) - baseline_pitch,
+                    pitch_gaze,
+                )
+                if slope is not None:
+                    pitch_gain = float(max(-0.03, min(0.03, slope)))
+                    pitch_r2 = r2
 
-        with state.lock:
-            state.calibration_applied = True
-            state.calibration_in_progress = False
-            state.calibration_gaze_offset_x = calibration_data.get("gaze_offset_x", 0.0)
-            state.calibration_gaze_offset_y = calibration_data.get("gaze_offset_y", 0.0)
-            state.calibration_scale_factor = calibration_data.get("scale_factor", 1.0)
-            state.calibration_screen_width = calibration_data.get(
-                "screen_width", viewport_width
-            )
-            state.calibration_screen_height = calibration_data.get(
-                "screen_height", viewport_height
-            )
             if baseline_yaw is not None:
-                state.calibration_head_yaw = float(baseline_yaw)
-            else:
-                state.calibration_head_yaw = float(getattr(state, "head_yaw", 0.0) or 0.0)
+                calibration_data["head_baseline_yaw"] = float(baseline_yaw)
             if baseline_pitch is not None:
-                state.calibration_head_pitch = float(baseline_pitch)
-            else:
-                state.calibration_head_pitch = float(getattr(state, "head_pitch", 0.0) or 0.0)
-            state.calibration_head_compensation_yaw_gain = calibration_data.get(
-                "head_compensation_yaw_gain", None
+                calibration_data["head_baseline_pitch"] = float(baseline_pitch)
+            if yaw_gain is not None:
+                calibration_data["head_compensation_yaw_gain"] = float(yaw_gain)
+                if yaw_r2 is not None and not math.isnan(yaw_r2):
+                    calibration_data["head_compensation_yaw_r2"] = float(yaw_r2)
+            if pitch_gain is not None:
+                calibration_data["head_compensation_pitch_gain"] = float(pitch_gain)
+                if pitch_r2 is not None and not math.isnan(pitch_r2):
+                    calibration_data["head_compensation_pitch_r2"] = float(pitch_r2)
+
+            if baseline_face_scale is not None:
+                calibration_data["face_scale_baseline"] = float(baseline_face_scale)
+
+            # Ensure calibration is persisted even if auto_save is disabled
+            get_webcam().calibration.save_calibration(user_id)
+
+            with state.lock:
+                state.calibration_applied = True
+                state.calibration_in_progress = False
+                state.calibration_gaze_offset_x = calibration_data.get("gaze_offset_x", 0.0)
+                state.calibration_gaze_offset_y = calibration_data.get("gaze_offset_y", 0.0)
+                state.calibration_scale_factor = calibration_data.get("scale_factor", 1.0)
+                state.calibration_screen_width = calibration_data.get(
+                    "screen_width", viewport_width
+                )
+                state.calibration_screen_height = calibration_data.get(
+                    "screen_height", viewport_height
+                )
+                if baseline_yaw is not None:
+                    state.calibration_head_yaw = float(baseline_yaw)
+                else:
+                    state.calibration_head_yaw = float(getattr(state, "head_yaw", 0.0) or 0.0)
+                if baseline_pitch is not None:
+                    state.calibration_head_pitch = float(baseline_pitch)
+                else:
+                    state.calibration_head_pitch = float(getattr(state, "head_pitch", 0.0) or 0.0)
+                state.calibration_head_compensation_yaw_gain = calibration_data.get(
+                    "head_compensation_yaw_gain", None
+                )
+                state.calibration_head_compensation_pitch_gain = calibration_data.get(
+                    "head_compensation_pitch_gain", None
+                )
+                state.calibration_face_scale = calibration_data.get("face_scale_baseline", None)
+
+                mapping = calibration_data.get("screen_mapping") or {}
+                if "x" in mapping and "y" in mapping:
+                    state.calibration_screen_mapping_x = mapping.get("x")
+                    state.calibration_screen_mapping_y = mapping.get("y")
+
+            logger.info(
+                f"[OK] Calibration saved: offset=({calibration_data.get('gaze_offset_x', 0.0):.3f}, {calibration_data.get('gaze_offset_y', 0.0):.3f}), scale={calibration_data.get('scale_factor', 1.0):.3f}"
             )
-            state.calibration_head_compensation_pitch_gain = calibration_data.get(
-                "head_compensation_pitch_gain", None
+
+            socketio.emit(
+                "calibration_saved",
+                {
+                    "status": "success",
+                    "offset_x": calibration_data.get("gaze_offset_x", 0.0),
+                    "offset_y": calibration_data.get("gaze_offset_y", 0.0),
+                    "scale_factor": calibration_data.get("scale_factor", 1.0),
+                    "head_yaw_gain": calibration_data.get("head_compensation_yaw_gain", None),
+                    "head_pitch_gain": calibration_data.get(
+                        "head_compensation_pitch_gain", None
+                    ),
+                    "sample_count": sample_count,
+                },
+                to=sid,
             )
-            state.calibration_face_scale = calibration_data.get("face_scale_baseline", None)
 
-            mapping = calibration_data.get("screen_mapping") or {}
-            if "x" in mapping and "y" in mapping:
-                state.calibration_screen_mapping_x = mapping.get("x")
-                state.calibration_screen_mapping_y = mapping.get("y")
+    except Exception as e:
+        logger.error(f"Calibration save error: {e}")
+        socketio.emit("calibration_error", {"error": str(e)}, to=sid)
 
-        logger.info(
-            f"[OK] Calibration saved: offset=({calibration_data.get('gaze_offset_x', 0.0):.3f}, {calibration_data.get('gaze_offset_y', 0.0):.3f}), scale={calibration_data.get('scale_factor', 1.0):.3f}"
-        )
 
-        emit(
-            "calibration_saved",
-            {
-                "status": "success",
-                "offset_x": calibration_data.get("gaze_offset_x", 0.0),
-                "offset_y": calibration_data.get("gaze_offset_y", 0.0),
-                "scale_factor": calibration_data.get("scale_factor", 1.0),
-                "head_yaw_gain": calibration_data.get("head_compensation_yaw_gain", None),
-                "head_pitch_gain": calibration_data.get(
-                    "head_compensation_pitch_gain", None
-                ),
-                "sample_count": sample_count,
-            },
+@socketio.on("calibration_complete")
+def handle_calibration_complete(data):
+    """Handle calibration complete - save calibration data"""
+    try:
+        gaze_data = data.get("data", [])
+        head_samples = data.get("head_samples", []) or []
+
+        if not gaze_data or len(gaze_data) < 9:
+            logger.warning("[WARN] Insufficient calibration data")
+            emit("calibration_error", {"error": "Insufficient data"})
+            return
+
+        # Bound the work per event; a normal run sends one point per 100ms
+        max_points = int(config.get("calibration", "max_points", default=2000))
+        if len(gaze_data) > max_points:
+            logger.warning(
+                f"[WARN] Calibration payload rejected: {len(gaze_data)} points"
+            )
+            emit("calibration_error", {"error": "Too many calibration points"})
+            return
+        max_samples = int(
+            config.get("calibration", "max_samples_per_point", default=200)
+        )
+        max_head_samples = int(
+            config.get("calibration", "max_head_samples", default=2000)
+        )
+        if isinstance(head_samples, list):
+            head_samples = head_samples[:max_head_samples]
+
+        # The fit and the disk save run off the socket handler; the result
+        # is emitted back to this client only
+        socketio.start_background_task(
+            _complete_calibration,
+            request.sid,
+            data,
+            gaze_data,
+            head_samples,
+            max_samples,
         )
 
     except Exception as e:
@@ -893,20 +1162,59 @@ def handle_calibration_cancel():
 @app.errorhandler(404)
 def not_found(e):
     """Handle 404 errors"""
-    return api_error("NOT_FOUND", "Not found", 404)
+    return json_bytes_response(_NOT_FOUND_BODY, 404)
+
+
+@app.errorhandler(413)
+def payload_too_large(e):
+    """Handle bodies over MAX_CONTENT_LENGTH"""
+    return api_error("PAYLOAD_TOO_LARGE", "Request body too large", 413)
 
 
 @app.errorhandler(500)
 def server_error(e):
     """Handle 500 errors"""
     logger.error(f"Server error: {e}")
-    return api_error("INTERNAL_ERROR", "Internal server error", 500)
+    return json_bytes_response(_SERVER_ERROR_BODY, 500)
 
 
 # ============================================================================
 # MAIN
 # ============================================================================
 
+def _warmup():
+    """Pay the cold-start costs before the first request arrives"""
+    start = time.perf_counter()
+    # Loads the MediaPipe/DeepFace models behind the processor
+    get_webcam()
+    # Imports torch/tf and initializes CUDA once for /api/environment
+    get_environment_probes()
+    logger.info(f"[OK] Warmup finished in {time.perf_counter() - start:.1f}s")
+
+
+def serve(port=None, debug=None):
+    """Warm up, then run the Socket.IO server (app.py and run.py entry point)"""
+    if port is None:
+        port = int(os.getenv("PORT", 8080))
+    if debug is None:
+        debug = os.getenv("DEBUG", "False").lower() == "true"
+
+    _warmup()
+
+    # Run with SocketIO. In threading mode this is Werkzeug with
+    # threaded=True, so REST calls never queue behind socket traffic. The
+    # reloader stays off even in debug: it re-runs the launcher in a child
+    # process, which would load the models and open the camera twice
+    socketio.run(
+        app,
+        host="0.0.0.0",
+        port=port,
+        debug=debug,
+        use_reloader=False,
+        allow_unsafe_werkzeug=True,
+    )
+
+
 if __name__ == "__main__":
     logger.info("Starting Eaglearn Flask Application...")
     logger.info(
@@ -914,13 +1222,8 @@ if __name__ == "__main__":
     )
 
     # Create templates directory if it doesn't exist
-    os.makedirs("templates", exist_ok=True)
-    os.makedirs("static", exist_ok=True)
+    for directory in ("templates", "static"):
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
 
-    # Run with SocketIO
-    socketio.run(
-        app,
-        host="0.0.0.0",
-        port=int(os.getenv("PORT", 8080)),
-        debug=os.getenv("DEBUG", "False").lower() == "true",
-    )
+    serve()
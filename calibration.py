@@ -10,6 +10,15 @@ from datetime import datetime
 from typing import Dict, Optional
 import numpy as np
 
+# Optional fast JSON encoder for calibration files
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,6 +41,8 @@ class CalibrationManager:
 
         self.current_calibration = self._load_default_calibration()
         self.calibration_points = []
+        # (N, 4) gaze_x, gaze_y, screen_x, screen_y blocks from bulk adds
+        self._point_blocks = []
 
         logger.info("[OK] CalibrationManager initialized")
 
@@ -58,6 +69,7 @@ class CalibrationManager:
         """
         self.current_user = user_id
         self.calibration_points = []
+        self._point_blocks = []
         logger.info(f"Starting calibration for user: {user_id}")
 
     def add_calibration_point(
@@ -86,25 +98,71 @@ class CalibrationManager:
             f"Added calibration point: screen=({screen_x}, {screen_y}), gaze=({gaze_x:.3f}, {gaze_y:.3f})"
         )
 
-    def calculate_calibration(self) -> Dict:
+    def add_calibration_points(self, screen_xy, gaze_xy):
+        """
+        Add many calibration points in one call
+
+        Args:
+            screen_xy: (N, 2) actual screen coordinates
+            gaze_xy: (N, 2) measured gaze values, row-aligned with screen_xy
+        """
+        screen_xy = np.asarray(screen_xy, dtype=float).reshape(-1, 2)
+        gaze_xy = np.asarray(gaze_xy, dtype=float).reshape(-1, 2)
+        if len(screen_xy) != len(gaze_xy):
+            raise ValueError("screen_xy and gaze_xy must have the same length")
+        if len(gaze_xy):
+            self._point_blocks.append(np.hstack((gaze_xy, screen_xy)))
+        logger.debug(f"Added {len(gaze_xy)} calibration points")
+
+    @property
+    def num_points(self) -> int:
+        """Points collected this session, single and bulk adds combined"""
+        return len(self.calibration_points) + sum(len(b) for b in self._point_blocks)
+
+    def _points_array(self) -> np.ndarray:
+        """All collected points as one (N, 4) gaze_x, gaze_y, screen_x, screen_y array"""
+        blocks = []
+        if self.calibration_points:
+            blocks.append(
+                np.array(
+                    [
+                        (p["gaze_x"], p["gaze_y"], p["screen_x"], p["screen_y"])
+                        for p in self.calibration_points
+                    ],
+                    dtype=float,
+                )
+            )
+        blocks.extend(self._point_blocks)
+        if not blocks:
+            return np.empty((0, 4), dtype=float)
+        return np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+
+    def calculate_calibration(self, save: bool = True) -> Dict:
         """
         Calculate calibration offsets from collected points
 
+        Args:
+            save: Honor calibration.auto_save; callers that persist the
+                result themselves pass False to skip the extra write
+
         Returns:
             dict: Calibration parameters
         """
-        if len(self.calibration_points) < 4:
+        if self.num_points < 4:
             logger.warning(
                 "Need at least 4 calibration points for accurate calibration"
             )
             return self.current_calibration
 
-        gaze_offset_x = sum(p["gaze_x"] for p in self.calibration_points) / len(
-            self.calibration_points
-        )
-        gaze_offset_y = sum(p["gaze_y"] for p in self.calibration_points) / len(
-            self.calibration_points
-        )
+        # One (N, 4) array; offsets and spread are single C-level reductions
+        points = self._points_array()
+        gaze_x_vals = points[:, 0]
+        gaze_y_vals = points[:, 1]
+        screen_x_vals = points[:, 2]
+        screen_y_vals = points[:, 3]
+
+        gaze_offset_x = float(gaze_x_vals.mean())
+        gaze_offset_y = float(gaze_y_vals.mean())
 
         expected_screen_width = self.config.get(
             "eye_tracking", "screen_width", default=1920
@@ -113,34 +171,19 @@ class CalibrationManager:
             "eye_tracking", "screen_height", default=1080
         )
 
-        gaze_x_vals = np.array(
-            [p["gaze_x"] for p in self.calibration_points], dtype=float
-        )
-        gaze_y_vals = np.array(
-            [p["gaze_y"] for p in self.calibration_points], dtype=float
-        )
-        dx = gaze_x_vals - float(gaze_offset_x)
-        dy = gaze_y_vals - float(gaze_offset_y)
-
-        spread = float(np.sqrt(np.mean(dx * dx) + np.mean(dy * dy)))
+        # RMS distance from the offset == sqrt of the summed axis variances
+        spread = float(np.sqrt(gaze_x_vals.var() + gaze_y_vals.var()))
         if spread <= 1e-6:
             scale_factor = 1.0
         else:
             scale_factor = 0.35 / spread
         scale_factor = float(np.clip(scale_factor, 0.5, 2.0))
 
-        gaze_x_cal = (gaze_x_vals - float(gaze_offset_x)) * scale_factor
-        gaze_y_cal = (gaze_y_vals - float(gaze_offset_y)) * scale_factor
-
-        screen_x_vals = np.array(
-            [p["screen_x"] for p in self.calibration_points], dtype=float
-        )
-        screen_y_vals = np.array(
-            [p["screen_y"] for p in self.calibration_points], dtype=float
-        )
+        gaze_x_cal = (gaze_x_vals - gaze_offset_x) * scale_factor
+        gaze_y_cal = (gaze_y_vals - gaze_offset_y) * scale_factor
 
         X = np.column_stack(
-            [gaze_x_cal, gaze_y_cal, np.ones(len(self.calibration_points), dtype=float)]
+            [gaze_x_cal, gaze_y_cal, np.ones(len(points), dtype=float)]
         )
         try:
             wx, _, _, _ = np.linalg.lstsq(X, screen_x_vals, rcond=None)
@@ -171,14 +214,14 @@ class CalibrationManager:
             "invert_y": bool(self.config.get("eye_tracking", "invert_y", default=False)),
             "user_id": getattr(self, "current_user", "default"),
             "calibrated_at": datetime.now().isoformat(),
-            "num_points": len(self.calibration_points),
+            "num_points": len(points),
             "screen_mapping": screen_mapping,
         }
 
         logger.info(f"[OK] Calibration calculated: {self.current_calibration}")
 
         # Auto-save if enabled
-        if self.config.get("calibration", "auto_save", default=True):
+        if save and self.config.get("calibration", "auto_save", default=True):
             self.save_calibration()
 
         return self.current_calibration
@@ -220,8 +263,17 @@ class CalibrationManager:
         filepath = os.path.join(self.calibration_dir, f"{user_id}.json")
 
         try:
-            with open(filepath, "w") as f:
-                json.dump(self.current_calibration, f, indent=2)
+            if ORJSON_AVAILABLE:
+                # Encode to bytes up front and write them in one call
+                payload = orjson.dumps(
+                    self.current_calibration,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY,
+                )
+                with open(filepath, "wb") as f:
+                    f.write(payload)
+            else:
+                with open(filepath, "w") as f:
+                    json.dump(self.current_calibration, f, indent=2)
             logger.info(f"[OK] Calibration saved to {filepath}")
         except Exception as e:
             logger.error(f"[ERROR] Error saving calibration: {e}")
@@ -259,8 +311,8 @@ class CalibrationManager:
             dict: Calibration status information
         """
         return {
-            "calibrated": len(self.calibration_points) >= 4,
-            "num_points": len(self.calibration_points),
+            "calibrated": self.num_points >= 4,
+            "num_points": self.num_points,
             "current_user": getattr(self, "current_user", "default"),
             "calibration": self.current_calibration,
         }
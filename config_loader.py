@@ -136,6 +136,20 @@ class Config:
             "performance", "selective_face_mesh", "stability_threshold", default=0.8
         )
 
+    @property
+    def face_mesh_frame_stride(self) -> int:
+        return self.get(
+            "performance", "selective_face_mesh", "frame_stride", default=2
+        )
+
+    @property
+    def pose_frame_stride(self) -> int:
+        return self.get("performance", "pose_frame_stride", default=3)
+
+    @property
+    def emotion_frame_stride(self) -> int:
+        return self.get("performance", "emotion_frame_stride", default=5)
+
     @property
     def camera_width(self) -> int:
         return self.get("camera", "width", default=640)
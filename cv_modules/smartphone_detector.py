@@ -1,19 +1,61 @@
 import os
 import cv2
+import numpy as np
+
+# Optional ONNX Runtime backend (graph-optimized, int8-capable); falls back
+# to cv2.dnn when missing
+try:
+    import onnxruntime as ort
+
+    ORT_AVAILABLE = True
+except Exception:
+    ort = None
+    ORT_AVAILABLE = False
 
 
 class SmartphoneDetector:
-    def __init__(self, model_path: str, score_threshold: float = 0.5):
+    def __init__(
+        self,
+        model_path: str,
+        score_threshold: float = 0.5,
+        backend: str = "auto",
+        intra_op_threads: int = 1,
+    ):
         self.model_path = model_path
         self.score_threshold = float(score_threshold)
         self.net = None
+        self.session = None
+        self.input_name = None
+        self.backend = None
         self.ready = False
 
         if not model_path or not os.path.exists(model_path):
             return
 
+        if backend in ("auto", "onnxruntime") and ORT_AVAILABLE:
+            try:
+                options = ort.SessionOptions()
+                options.graph_optimization_level = (
+                    ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                )
+                # The detector runs beside MediaPipe/DeepFace on the inference
+                # pool; keep ORT from claiming every core for itself
+                options.intra_op_num_threads = max(0, int(intra_op_threads))
+                self.session = ort.InferenceSession(
+                    model_path,
+                    sess_options=options,
+                    providers=["CPUExecutionProvider"],
+                )
+                self.input_name = self.session.get_inputs()[0].name
+                self.backend = "onnxruntime"
+                self.ready = True
+                return
+            except Exception:
+                self.session = None
+
         try:
             self.net = cv2.dnn.readNetFromONNX(model_path)
+            self.backend = "opencv"
             self.ready = True
         except Exception:
             self.net = None
@@ -23,53 +65,52 @@ class SmartphoneDetector:
         self.score_threshold = float(score_threshold)
 
     def detect(self, frame_bgr):
-        if not self.ready or self.net is None:
+        if not self.ready:
             return []
 
         h, w = frame_bgr.shape[:2]
         blob = cv2.dnn.blobFromImage(
             frame_bgr, scalefactor=1 / 255.0, size=(640, 640), swapRB=True, crop=False
         )
-        self.net.setInput(blob)
-        outputs = self.net.forward()
-
-        detections = []
+        if self.session is not None:
+            outputs = self.session.run(None, {self.input_name: blob})
+        elif self.net is not None:
+            self.net.setInput(blob)
+            outputs = self.net.forward()
+        else:
+            return []
 
         out = outputs[0] if isinstance(outputs, (list, tuple)) else outputs
         if out is None:
             return []
 
         out = out.reshape(-1, out.shape[-1]) if out.ndim > 2 else out
-        for row in out:
-            if row.shape[0] < 6:
-                continue
-            cx, cy, bw, bh = row[0:4]
-            obj = row[4]
-            cls_scores = row[5:]
-            if cls_scores.size == 0:
-                continue
-            cls_id = int(cls_scores.argmax())
-            cls_score = float(cls_scores[cls_id])
-            score = float(obj) * cls_score
-            if score < self.score_threshold:
-                continue
+        if out.ndim != 2 or out.shape[1] < 6:
+            return []
 
-            x1 = int((cx - bw / 2) * w / 640)
-            y1 = int((cy - bh / 2) * h / 640)
-            x2 = int((cx + bw / 2) * w / 640)
-            y2 = int((cy + bh / 2) * h / 640)
-            x1 = max(0, min(w - 1, x1))
-            y1 = max(0, min(h - 1, y1))
-            x2 = max(0, min(w - 1, x2))
-            y2 = max(0, min(h - 1, y2))
+        # Decode every candidate row at once instead of looping in Python
+        cls_scores = out[:, 5:]
+        cls_ids = cls_scores.argmax(axis=1)
+        scores = out[:, 4].astype(np.float64) * cls_scores[
+            np.arange(len(out)), cls_ids
+        ].astype(np.float64)
+        keep = np.flatnonzero(scores >= self.score_threshold)
+        if keep.size == 0:
+            return []
+        keep = keep[np.argsort(-scores[keep], kind="stable")]
 
-            detections.append(
-                {
-                    "bbox": (x1, y1, x2, y2),
-                    "score": score,
-                    "class_id": cls_id,
-                }
-            )
+        cx, cy, bw, bh = out[keep, :4].astype(np.float64).T
+        # astype(int) truncates toward zero, like int()
+        x1 = np.clip(((cx - bw / 2) * w / 640).astype(np.int64), 0, w - 1)
+        y1 = np.clip(((cy - bh / 2) * h / 640).astype(np.int64), 0, h - 1)
+        x2 = np.clip(((cx + bw / 2) * w / 640).astype(np.int64), 0, w - 1)
+        y2 = np.clip(((cy + bh / 2) * h / 640).astype(np.int64), 0, h - 1)
 
-        detections.sort(key=lambda d: d["score"], reverse=True)
-        return detections
+        return [
+            {
+                "bbox": (int(x1[i]), int(y1[i]), int(x2[i]), int(y2[i])),
+                "score": float(scores[k]),
+                "class_id": int(cls_ids[k]),
+            }
+            for i, k in enumerate(keep)
+        ]
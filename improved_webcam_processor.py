@@ -7,11 +7,12 @@ import os
 import json
 import logging
 import time
-import base64
 import cv2
 import numpy as np
-from collections import deque
-from threading import Thread, Lock
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Full, Empty
+from threading import Thread, Lock, Event
 from typing import Any
 
 from config_loader import config
@@ -34,8 +35,50 @@ except Exception as e:
     logging.getLogger(__name__).warning(f"[WARN] VLM import failed (optional): {e}")
     VLM_AVAILABLE = False
 
+# Optional libjpeg-turbo encoder (SIMD); falls back to cv2.imencode
+TURBOJPEG_IMPORT_ERROR = None
+TurboJPEG: Any = None
+try:
+    from turbojpeg import TurboJPEG as _TurboJPEG, TJPF_BGR, TJSAMP_420
+
+    TurboJPEG = _TurboJPEG
+    TURBOJPEG_AVAILABLE = True
+except Exception as e:
+    TURBOJPEG_IMPORT_ERROR = str(e)
+    TURBOJPEG_AVAILABLE = False
+
+# Optional fast JSON encoder for the metrics log
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Accepted set_quality_preset names; the REST route validates against it too
+QUALITY_PRESETS = frozenset(("low", "balanced", "high"))
+
+# Face overlay drawing specs, built once instead of per frame
+OVERLAY_GROUP_ORDER = {
+    "left_eye": (33, 159, 145, 133),
+    "right_eye": (362, 386, 374, 263),
+    "left_iris": (468, 469, 470, 471, 472),
+    "right_iris": (473, 474, 475, 476, 477),
+    "mouth": (13, 14, 291, 61),
+}
+OVERLAY_GROUP_COLORS = {
+    "mesh": (0, 255, 0),
+    "left_eye": (255, 255, 0),
+    "right_eye": (255, 255, 0),
+    "left_iris": (200, 200, 0),
+    "right_iris": (200, 200, 0),
+    "nose": (255, 255, 255),
+    "mouth": (255, 0, 255),
+}
+
 
 class ImprovedWebcamProcessor:
     """Enhanced webcam processor with all improvements"""
@@ -47,23 +90,73 @@ class ImprovedWebcamProcessor:
         self.cap = None
         self.running = False
         self.starting = False
-        self.thread = None
+        self.threads = []
         self.lock = Lock()
         self.processing_enabled = True
         self.metrics_log_fp = None
         self.metrics_log_path = None
         self.last_metrics_log_time = 0.0
+        # Records are buffered by the file object and pushed to the OS at
+        # this interval, not once per record
+        self.metrics_log_flush_interval = float(
+            config.get("logging", "metrics_flush_interval_seconds", default=5.0)
+        )
+        self.last_metrics_log_flush = 0.0
+        # Guards writes/flushes so a download never sees half a record
+        self.metrics_log_lock = Lock()
         self.last_state_emit_time = 0.0
+        self.state_emit_interval = float(
+            config.get("ui", "state_emit_interval_seconds", default=0.33)
+        )
+        self._last_state_emit_key = None
+        # (state snapshot, vlm insights) of the last state_update sent
+        self._last_sent_state = None
+        # Latest-wins hand-off to the state emitter thread: repeated requests
+        # before it wakes coalesce into a single emit of the newest state
+        self._state_emit_event = Event()
+        # (intervals list, interval count, stats, running totals) for
+        # calculate_unfocus_analytics
+        self._unfocus_analytics_cache = None
         self.jpeg_quality = int(config.get("ui", "jpeg_quality", default=75))
         self.quality_preset = str(
             config.get("ui", "quality_preset", default="balanced")
         )
 
+        # Capture -> inference -> encode pipeline (bounded hand-off queues)
+        self.pipeline_queue_size = int(
+            config.get("performance", "pipeline_queue_size", default=2)
+        )
+        self._capture_queue = Queue(maxsize=self.pipeline_queue_size)
+        self._encode_queue = Queue(maxsize=self.pipeline_queue_size)
+        # Socket.IO clients watching the feed; no viewers means no encoding
+        self._clients = set()
+        self.jpeg_encoder = None
+        if TURBOJPEG_AVAILABLE:
+            try:
+                self.jpeg_encoder = TurboJPEG()
+                logger.info("[OK] TurboJPEG encoder enabled")
+            except Exception as e:
+                logger.info(f"[INFO] TurboJPEG unavailable, using OpenCV: {e}")
+        self.inference_width = int(
+            config.get("performance", "inference_width", default=320)
+        )
+        opencv_threads = int(config.get("performance", "opencv_threads", default=2))
+        if opencv_threads > 0:
+            cv2.setNumThreads(opencv_threads)
+
         # GPU acceleration check
         self.gpu_enabled = self._check_gpu_support()
 
         # Initialize processors
         self.pose_processor = PoseProcessor(config)
+        # Pose runs next to face processing; MediaPipe releases the GIL
+        # inside its native graphs so the two overlap
+        self.inference_pool = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="webcam-pose"
+        )
+        # In-flight pose job; like MediaPipe's LIVE_STREAM mode, frames are
+        # dropped while it runs and the latest finished result is applied
+        self._pose_future = None
         self.face_processor = FaceMeshProcessor(config)
         self.deepface_detector = DeepFaceEmotionDetector(
             config, gpu_enabled=self.gpu_enabled
@@ -169,7 +262,14 @@ class ImprovedWebcamProcessor:
                 config.get("smartphone_detection", "threshold", default=0.5)
             )
             self.smartphone_detector = SmartphoneDetector(
-                model_path=model_path, score_threshold=threshold
+                model_path=model_path,
+                score_threshold=threshold,
+                backend=str(
+                    config.get("smartphone_detection", "backend", default="auto")
+                ),
+                intra_op_threads=int(
+                    config.get("smartphone_detection", "intra_op_threads", default=1)
+                ),
             )
             if not getattr(self.smartphone_detector, "ready", False):
                 self.smartphone_detector = None
@@ -177,6 +277,8 @@ class ImprovedWebcamProcessor:
 
         # Frame processing
         self.frame_skip = config.frame_skip_base
+        self.pose_stride = max(1, int(config.pose_frame_stride))
+        self.emotion_stride = max(1, int(config.emotion_frame_stride))
         self.fps_history = deque(maxlen=30)
         self.frame_timestamp = 0
         self.timestamp_increment = 33333
@@ -267,7 +369,7 @@ class ImprovedWebcamProcessor:
 
     def set_quality_preset(self, preset: str):
         preset = (preset or "").strip().lower()
-        if preset not in ("low", "balanced", "high"):
+        if preset not in QUALITY_PRESETS:
             preset = "balanced"
 
         if preset == "low":
@@ -479,6 +581,8 @@ class ImprovedWebcamProcessor:
         self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, config.camera_width)
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config.camera_height)
         self.cap.set(cv2.CAP_PROP_FPS, config.camera_fps)
+        # Keep at most one frame queued in the driver so reads stay fresh
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
         logger.info(
             f"[OK] Webcam opened: {config.camera_width}x{config.camera_height} @ {config.camera_fps}fps"
@@ -487,8 +591,22 @@ class ImprovedWebcamProcessor:
         with self.lock:
             self.running = True
             self.starting = False
-            self.thread = Thread(target=self._process_loop, daemon=True)
-            self.thread.start()
+            self._capture_queue = Queue(maxsize=self.pipeline_queue_size)
+            self._encode_queue = Queue(maxsize=self.pipeline_queue_size)
+            self.threads = [
+                Thread(target=self._capture_loop, name="webcam-capture", daemon=True),
+                Thread(
+                    target=self._process_loop, name="webcam-inference", daemon=True
+                ),
+                Thread(target=self._encode_loop, name="webcam-encode", daemon=True),
+                Thread(
+                    target=self._state_emit_loop,
+                    name="webcam-state-emit",
+                    daemon=True,
+                ),
+            ]
+            for thread in self.threads:
+                thread.start()
 
         try:
             self.set_quality_preset(self.quality_preset)
@@ -506,9 +624,25 @@ class ImprovedWebcamProcessor:
         with self.lock:
             self.running = False
             self.starting = False
-
-        if self.thread:
-            self.thread.join(timeout=3)
+            threads = self.threads
+            self.threads = []
+
+        # Wake any stage blocked on an empty queue
+        self._pipeline_put_sentinel(self._capture_queue)
+        self._pipeline_put_sentinel(self._encode_queue)
+        self._state_emit_event.set()
+        for thread in threads:
+            thread.join(timeout=3)
+
+        # Pose runs on the inference pool, so joining the threads does not
+        # cover it; let an in-flight job finish before the graph is closed
+        pose_future, self._pose_future = self._pose_future, None
+        if pose_future is not None:
+            pose_future.cancel()
+            try:
+                pose_future.result(timeout=3)
+            except Exception:
+                pass
 
         if self.cap:
             self.cap.release()
@@ -564,6 +698,7 @@ class ImprovedWebcamProcessor:
             )
             self.metrics_log_fp = open(self.metrics_log_path, "a", encoding="utf-8")
             self.last_metrics_log_time = 0.0
+            self.last_metrics_log_flush = time.time()
             logger.info(f"[OK] Metrics log started: {self.metrics_log_path}")
         except Exception as e:
             self.metrics_log_fp = None
@@ -571,15 +706,26 @@ class ImprovedWebcamProcessor:
             logger.error(f"[ERROR] Failed to open metrics log: {e}")
 
     def _close_metrics_log(self):
-        try:
-            if self.metrics_log_fp:
-                self.metrics_log_fp.flush()
-                self.metrics_log_fp.close()
-        except Exception as e:
-            logger.error(f"[ERROR] Failed to close metrics log: {e}")
-        finally:
-            self.metrics_log_fp = None
-            self.metrics_log_path = None
+        with self.metrics_log_lock:
+            try:
+                if self.metrics_log_fp:
+                    self.metrics_log_fp.flush()
+                    self.metrics_log_fp.close()
+            except Exception as e:
+                logger.error(f"[ERROR] Failed to close metrics log: {e}")
+            finally:
+                self.metrics_log_fp = None
+                self.metrics_log_path = None
+
+    def flush_metrics_log(self):
+        """Push buffered metrics records to disk (e.g. before a download)"""
+        with self.metrics_log_lock:
+            try:
+                if self.metrics_log_fp:
+                    self.metrics_log_fp.flush()
+                    self.last_metrics_log_flush = time.time()
+            except Exception as e:
+                logger.error(f"[ERROR] Failed to flush metrics log: {e}")
 
     def _write_metrics_log(self):
         if not self.metrics_log_fp:
@@ -618,24 +764,77 @@ class ImprovedWebcamProcessor:
                 "webcam": state_dict.get("webcam"),
                 "rule_metrics": state_dict.get("rule_metrics", {}),
             }
-            self.metrics_log_fp.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
-            self.metrics_log_fp.flush()
+            if ORJSON_AVAILABLE:
+                line = orjson.dumps(
+                    snapshot,
+                    option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE,
+                ).decode("utf-8")
+            else:
+                line = json.dumps(snapshot, ensure_ascii=False) + "\n"
+            with self.metrics_log_lock:
+                if not self.metrics_log_fp:
+                    return
+                self.metrics_log_fp.write(line)
+                if (
+                    now - self.last_metrics_log_flush
+                ) >= self.metrics_log_flush_interval:
+                    self.metrics_log_fp.flush()
+                    self.last_metrics_log_flush = now
         except Exception as e:
             logger.error(f"[ERROR] Failed to write metrics log: {e}")
 
-    def _process_loop(self):
-        """Main processing loop"""
-        frame_times = deque(maxlen=30)
+    def _pipeline_put(self, q, item) -> bool:
+        """Blocking put that backpressures the producer but gives up on stop"""
+        while self.running:
+            try:
+                q.put(item, timeout=0.2)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _pipeline_put_sentinel(self, q):
+        """Push the shutdown sentinel, evicting a queued frame if needed"""
+        while True:
+            try:
+                q.put_nowait(None)
+                return
+            except Full:
+                try:
+                    q.get_nowait()
+                except Empty:
+                    pass
+
+    def _capture_loop(self):
+        """Pipeline stage A: grab frames and convert them for inference"""
         time.sleep(0.5)  # Give camera time to stabilize
 
-        logger.info("[RUNNING] Processing loop started")
+        logger.info("[RUNNING] Capture loop started")
 
         consecutive_read_failures = 0
+        frame_interval = 1.0 / max(1, int(config.camera_fps))
+        drop_stale_frame = False
+
+        # Reused capture/conversion buffers. Captured and rgb frames travel
+        # down the pipeline, so they rotate through rings deep enough that a
+        # slot is never rewritten while a later stage still reads it; the
+        # downscaled BGR copy never leaves this thread and needs one buffer
+        ring_size = 2 * self._capture_queue.maxsize + 3
+        capture_ring = [None] * ring_size
+        rgb_ring = [None] * ring_size
+        ring_slot = 0
+        small_buf = None
 
         while self.running:
             try:
-                frame_start_time = time.time()  # Start timing for FPS calculation
-                ret, frame = self.cap.read()
+                if drop_stale_frame:
+                    # Inference backpressured us; the driver is holding a
+                    # frame captured while we waited, so skip to the latest
+                    self.cap.grab()
+                ret = self.cap.grab()
+                frame = None
+                if ret:
+                    ret, frame = self.cap.retrieve(capture_ring[ring_slot])
                 if not ret:
                     consecutive_read_failures += 1
                     if consecutive_read_failures % 10 == 0:
@@ -656,10 +855,62 @@ class ImprovedWebcamProcessor:
                     continue
 
                 consecutive_read_failures = 0
+                capture_ring[ring_slot] = frame
 
-                # Process frame
                 frame = self._apply_lighting_adaptation(frame)
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+                # MediaPipe resizes internally to ~128-256px, so hand it a
+                # downscaled copy; the full-res frame is kept for display
+                small = frame
+                h, w = frame.shape[:2]
+                if 0 < self.inference_width < w:
+                    small = small_buf = cv2.resize(
+                        frame,
+                        (self.inference_width, max(1, (h * self.inference_width) // w)),
+                        dst=small_buf,
+                        interpolation=cv2.INTER_AREA,
+                    )
+                rgb_frame = cv2.cvtColor(
+                    small, cv2.COLOR_BGR2RGB, dst=rgb_ring[ring_slot]
+                )
+                rgb_ring[ring_slot] = rgb_frame
+                ring_slot = (ring_slot + 1) % ring_size
+
+                put_start = time.time()
+                if not self._pipeline_put(self._capture_queue, (frame, rgb_frame)):
+                    break
+                drop_stale_frame = (time.time() - put_start) > frame_interval
+
+            except Exception as e:
+                logger.error(f"Error in capture loop: {e}", exc_info=True)
+
+        logger.info("[STOP] Capture loop exited")
+
+    def _process_loop(self):
+        """Pipeline stage B: run inference and update session state"""
+        frame_times = deque(maxlen=30)
+        frame_times_sum = 0.0  # Running sum of frame_times, kept O(1)
+        last_frame_done_time = None
+
+        logger.info("[RUNNING] Processing loop started")
+
+        while self.running:
+            item = self._capture_queue.get()
+            if item is None:
+                break
+            frame, rgb_frame = item
+
+            try:
+                # Start pose on the worker pool so it overlaps face processing.
+                # The job may outlive this frame, so it gets its own copy of the
+                # (downscaled) rgb buffer, which the capture ring will reuse
+                if (
+                    self._pose_future is None
+                    and self.state.frame_count % self.pose_stride == 0
+                ):
+                    self._pose_future = self.inference_pool.submit(
+                        self.pose_processor.process, rgb_frame.copy()
+                    )
 
                 # Process face
                 try:
@@ -679,56 +930,63 @@ class ImprovedWebcamProcessor:
                             self.face_mesh_overlay_stride
                         )
 
-                    face_metrics = self.face_processor.process(frame_copy, self.state)
+                    face_metrics = self.face_processor.process(
+                        frame_copy,
+                        self.state,
+                        frame_size=(frame.shape[1], frame.shape[0]),
+                    )
                     with self.lock:
                         self._last_face_overlay = face_metrics.get("_overlay")
 
+                    # Apply smoothing to gaze values
+                    if "eye_gaze_x" in face_metrics and "eye_gaze_y" in face_metrics:
+                        face_metrics["eye_gaze_x"], face_metrics["eye_gaze_y"] = (
+                            self._smooth_gaze(
+                                face_metrics["eye_gaze_x"],
+                                face_metrics["eye_gaze_y"],
+                            )
+                        )
+
+                    # Smooth metrics outside the lock; only the writes below
+                    # hold state.lock so to_dict() readers are never starved
+                    updates = {}
+                    for key, value in face_metrics.items():
+                        if not hasattr(self.state, key):
+                            continue
+                        if key in (
+                            "head_yaw",
+                            "head_pitch",
+                            "head_roll",
+                            "attention_score",
+                            "eye_aspect_ratio",
+                            "mouth_aspect_ratio",
+                        ):
+                            try:
+                                v = float(value)
+                                prev = self._metric_ema.get(key)
+                                a = float(self.metric_smoothing_alpha)
+                                a = max(0.05, min(0.9, a))
+                                if prev is None:
+                                    self._metric_ema[key] = v
+                                else:
+                                    self._metric_ema[key] = (a * v) + (
+                                        (1.0 - a) * float(prev)
+                                    )
+                                value = self._metric_ema[key]
+                            except Exception:
+                                pass
+                        updates[key] = value
+                    now = time.time()
+
                     with self.state.lock:
                         self.state.face_detected = face_metrics.get(
                             "face_detected", False
                         )
                         self.state.face_count = face_metrics.get("face_count", 0)
-
-                        # Apply smoothing to gaze values
-                        if (
-                            "eye_gaze_x" in face_metrics
-                            and "eye_gaze_y" in face_metrics
-                        ):
-                            face_metrics["eye_gaze_x"], face_metrics["eye_gaze_y"] = (
-                                self._smooth_gaze(
-                                    face_metrics["eye_gaze_x"],
-                                    face_metrics["eye_gaze_y"],
-                                )
-                            )
-
-                        # Update all face metrics
-                        for key, value in face_metrics.items():
-                            if hasattr(self.state, key):
-                                if key in (
-                                    "head_yaw",
-                                    "head_pitch",
-                                    "head_roll",
-                                    "attention_score",
-                                    "eye_aspect_ratio",
-                                    "mouth_aspect_ratio",
-                                ):
-                                    try:
-                                        v = float(value)
-                                        prev = self._metric_ema.get(key)
-                                        a = float(self.metric_smoothing_alpha)
-                                        a = max(0.05, min(0.9, a))
-                                        if prev is None:
-                                            self._metric_ema[key] = v
-                                        else:
-                                            self._metric_ema[key] = (a * v) + (
-                                                (1.0 - a) * float(prev)
-                                            )
-                                        value = self._metric_ema[key]
-                                    except Exception:
-                                        pass
-                                setattr(self.state, key, value)
+                        for key, value in updates.items():
+                            setattr(self.state, key, value)
                         if bool(getattr(self.state, "face_mesh_processed", False)):
-                            self.state.last_face_mesh_time = time.time()
+                            self.state.last_face_mesh_time = now
 
                     self._update_rule_based_metrics()
 
@@ -773,15 +1031,12 @@ class ImprovedWebcamProcessor:
                     ):
                         self._request_vlm_analysis()
 
-                    # Process pose
+                    # Apply the pose result once ready, without blocking on it
                     try:
-                        if self.state.frame_count % 3 == 0:
-                            if rgb_frame is not None and isinstance(
-                                rgb_frame, np.ndarray
-                            ):
-                                frame_copy = rgb_frame.copy()
-                                pose_metrics = self.pose_processor.process(frame_copy)
-
+                        if self._pose_future is not None and self._pose_future.done():
+                            pose_future, self._pose_future = self._pose_future, None
+                            pose_metrics = pose_future.result()
+                            if pose_metrics:
                                 with self.state.lock:
                                     self.state.body_detected = pose_metrics.get(
                                         "body_detected", False
@@ -798,13 +1053,19 @@ class ImprovedWebcamProcessor:
 
                     # Detect emotion
                     try:
-                        if self.state.frame_count % 5 == 0:
+                        if self.state.frame_count % self.emotion_stride == 0:
                             if self.deepface_detector.available:
-                                if rgb_frame is not None and isinstance(
-                                    rgb_frame, np.ndarray
+                                # Skip DeepFace entirely when no face is visible
+                                if (
+                                    frame is not None
+                                    and isinstance(frame, np.ndarray)
+                                    and bool(self.state.face_detected)
                                 ):
                                     try:
-                                        emotion_frame = rgb_frame.copy()
+                                        # DeepFace needs full-res detail
+                                        emotion_frame = cv2.cvtColor(
+                                            frame, cv2.COLOR_BGR2RGB
+                                        )
                                         emotion_result = (
                                             self.deepface_detector.detect_emotion(
                                                 emotion_frame
@@ -818,15 +1079,14 @@ class ImprovedWebcamProcessor:
                                             self.state.emotion_confidence = (
                                                 emotion_result["emotion_confidence"]
                                             )
-
-                                        if "emotion_scores" in emotion_result:
-                                            if not hasattr(
-                                                self.state, "emotion_scores"
-                                            ):
-                                                self.state.emotion_scores = {}
-                                            self.state.emotion_scores.update(
-                                                emotion_result["emotion_scores"]
-                                            )
+                                            if "emotion_scores" in emotion_result:
+                                                if not hasattr(
+                                                    self.state, "emotion_scores"
+                                                ):
+                                                    self.state.emotion_scores = {}
+                                                self.state.emotion_scores.update(
+                                                    emotion_result["emotion_scores"]
+                                                )
 
                                     except Exception as e:
                                         if VLM_AVAILABLE:
@@ -858,14 +1118,17 @@ class ImprovedWebcamProcessor:
                 except Exception as e:
                     logger.error(f"[ERROR] Face processing error: {e}")
 
-                # Draw feedback
-                self._draw_lightweight_feedback(frame)
-
-                # Calculate FPS
-                frame_time = time.time() - frame_start_time
-                frame_times.append(frame_time)
+                # Calculate FPS from the pipeline's inference throughput
+                now = time.time()
+                if last_frame_done_time is not None:
+                    dt = now - last_frame_done_time
+                    if len(frame_times) == frame_times.maxlen:
+                        frame_times_sum -= frame_times[0]
+                    frame_times.append(dt)
+                    frame_times_sum += dt
+                last_frame_done_time = now
                 if frame_times:
-                    fps = 1.0 / (sum(frame_times) / len(frame_times))
+                    fps = len(frame_times) / max(frame_times_sum, 1e-6)
                     self.state.fps = fps
                     self.fps_history.append(fps)
 
@@ -874,12 +1137,17 @@ class ImprovedWebcamProcessor:
                     self.state.frame_count += 1
 
                 self._run_smartphone_detection(frame)
-                self._draw_smartphone_feedback(frame)
                 self._maybe_update_vlm_status()
 
-                # Emit frame
                 if self.state.frame_count % 2 == 0:
-                    self._emit_frame(frame)
+                    # VLM analyzes the latest frame whether or not anyone is
+                    # watching; copied before the encoder draws overlays on it
+                    self.current_frame = frame.copy()
+                    # Hand the frame to the encoder stage, unless nobody is
+                    # watching (state stays queryable via /api/state)
+                    if self.has_clients():
+                        if not self._pipeline_put(self._encode_queue, frame):
+                            break
 
                 # Log periodically
                 if self.state.frame_count % config.log_interval == 0:
@@ -887,11 +1155,28 @@ class ImprovedWebcamProcessor:
                         f"FPS: {self.state.fps:.1f} | Focus: {self.state.focus_percentage:.0f}%"
                     )
 
-                time.sleep(0.01)
-
             except Exception as e:
                 logger.error(f"Error in processing loop: {e}", exc_info=True)
 
+        logger.info("[STOP] Processing loop exited")
+
+    def _encode_loop(self):
+        """Pipeline stage C: draw overlays, encode and emit frames"""
+        logger.info("[RUNNING] Encode loop started")
+
+        while self.running:
+            frame = self._encode_queue.get()
+            if frame is None:
+                break
+            try:
+                self._draw_lightweight_feedback(frame)
+                self._draw_smartphone_feedback(frame)
+                self._emit_frame(frame)
+            except Exception as e:
+                logger.error(f"Error in encode loop: {e}", exc_info=True)
+
+        logger.info("[STOP] Encode loop exited")
+
     def _smooth_gaze(self, gaze_x, gaze_y):
         """Apply smoothing to gaze coordinates"""
         if not self.gaze_smoothing_enabled:
@@ -973,46 +1258,44 @@ class ImprovedWebcamProcessor:
                 now if not isinstance(last_yawn_time, (int, float)) else last_yawn_time
             )
 
+        ear_risk = float(np.clip((0.22 - ear) * 5.0, 0.0, 1.0))
+        mar_risk = float(np.clip((mar - yawning_mar_threshold) * 2.5, 0.0, 1.0))
+        head_away = (
+            1.0
+            if (
+                head_yaw
+                > float(config.get("distractions", "head_turn_threshold", default=20))
+                or head_pitch
+                > float(config.get("distractions", "head_pitch_threshold", default=15))
+            )
+            else 0.0
+        )
+        blink_risk = 0.0
+        if blink_rate < 10:
+            blink_risk = 0.2
+        elif blink_rate > 30:
+            blink_risk = 0.1
+        sleepiness = float(
+            np.clip(ear_risk * 0.55 + mar_risk * 0.35 + blink_risk * 0.10, 0.0, 1.0)
+        )
+        rule_metrics = {
+            "confusion_level_rule": confusion,
+            "stress_level_rule": stress,
+            "drowsiness_risk": float(
+                np.clip(ear_risk * 0.7 + mar_risk * 0.3, 0.0, 1.0)
+            ),
+            "sleepiness_score": float(round(sleepiness * 100.0, 2)),
+            "head_away": float(head_away),
+            "yawning_duration": float(yawning_duration),
+        }
+
         with self.state.lock:
             self.state.confusion_level = confusion
             self.state.stress_level = stress
             self.state.yawning_duration = yawning_duration
             self.state.last_yawn_time = last_yawn_time
-            ear_risk = float(np.clip((0.22 - ear) * 5.0, 0.0, 1.0))
-            mar_risk = float(np.clip((mar - yawning_mar_threshold) * 2.5, 0.0, 1.0))
-            head_away = (
-                1.0
-                if (
-                    head_yaw
-                    > float(
-                        config.get("distractions", "head_turn_threshold", default=20)
-                    )
-                    or head_pitch
-                    > float(
-                        config.get("distractions", "head_pitch_threshold", default=15)
-                    )
-                )
-                else 0.0
-            )
-            blink_risk = 0.0
-            if blink_rate < 10:
-                blink_risk = 0.2
-            elif blink_rate > 30:
-                blink_risk = 0.1
-            sleepiness = float(
-                np.clip(ear_risk * 0.55 + mar_risk * 0.35 + blink_risk * 0.10, 0.0, 1.0)
-            )
-            self.state.sleepiness_score = float(round(sleepiness * 100.0, 2))
-            self.state.rule_metrics = {
-                "confusion_level_rule": confusion,
-                "stress_level_rule": stress,
-                "drowsiness_risk": float(
-                    np.clip(ear_risk * 0.7 + mar_risk * 0.3, 0.0, 1.0)
-                ),
-                "sleepiness_score": float(round(sleepiness * 100.0, 2)),
-                "head_away": float(head_away),
-                "yawning_duration": float(yawning_duration),
-            }
+            self.state.sleepiness_score = rule_metrics["sleepiness_score"]
+            self.state.rule_metrics = rule_metrics
 
     def _estimate_rule_based_emotion(self):
         with self.state.lock:
@@ -1795,6 +2078,67 @@ class ImprovedWebcamProcessor:
             self.state.last_tracking_update = current_time
             self.state.last_focus_status = focus_status
 
+    def calculate_unfocus_analytics(self):
+        """Unfocus statistics for the session; running totals are folded in
+        only for intervals closed since the last call"""
+        intervals = self.state.unfocus_intervals
+        count = len(intervals)
+        cached = getattr(self, "_unfocus_analytics_cache", None)
+        if cached is not None and cached[0] is intervals and cached[1] == count:
+            stats = cached[2]
+        else:
+            if cached is not None and cached[0] is intervals and cached[1] < count:
+                # Fold into a copy: concurrent requests may share this base,
+                # and the cached totals must stay those of cached[1]
+                seen = cached[1]
+                totals = dict(cached[3], reasons=Counter(cached[3]["reasons"]))
+            else:
+                # New session list (or it shrank): start the totals over
+                seen = 0
+                totals = {"total": 0.0, "min": None, "max": None, "reasons": Counter()}
+            for i in intervals[seen:count]:
+                d = float(i.get("duration", 0.0))
+                totals["total"] += d
+                totals["min"] = d if totals["min"] is None else min(totals["min"], d)
+                totals["max"] = d if totals["max"] is None else max(totals["max"], d)
+                totals["reasons"][str(i.get("reason", "unknown"))] += 1
+            total = totals["total"]
+            stats = {
+                "total_duration": total,
+                "avg_duration": total / count if count else 0.0,
+                "min_duration": totals["min"] if totals["min"] is not None else 0.0,
+                "max_duration": totals["max"] if totals["max"] is not None else 0.0,
+                "common_reasons": [
+                    {"reason": reason, "count": n}
+                    for reason, n in totals["reasons"].most_common(3)
+                ],
+                # Rounded once here, so callers can serialize it as-is
+                "recent_intervals": [
+                    {
+                        "start": i.get("start"),
+                        "end": i.get("end"),
+                        "duration": round(float(i.get("duration", 0.0)), 1),
+                        "reason": i.get("reason", "unknown"),
+                    }
+                    for i in intervals[max(0, count - 5):count]
+                ],
+            }
+            self._unfocus_analytics_cache = (intervals, count, stats, totals)
+
+        # Time-dependent fields are cheap and computed per call
+        start = self.state.session_start_time
+        first = self.state.first_unfocus_time
+        elapsed_hours = (time.time() - start) / 3600.0 if start else 0.0
+        analytics = dict(stats)
+        analytics["unfocus_count"] = int(self.state.unfocus_count)
+        analytics["time_to_first_unfocus"] = (
+            float(first - start) if first is not None and start else None
+        )
+        analytics["unfocus_rate"] = (
+            round(count / elapsed_hours, 2) if elapsed_hours > 0 else 0.0
+        )
+        return analytics
+
     def _request_vlm_analysis(self):
         """Request VLM analysis"""
         if not bool(getattr(self, "vlm_user_enabled", False)):
@@ -2050,14 +2394,6 @@ class ImprovedWebcamProcessor:
                         if x2 > x1 and y2 > y1:
                             cv2.rectangle(overlay, (x1, y1), (x2, y2), (0, 255, 0), 1)
 
-                    groups_order = {
-                        "left_eye": [33, 159, 145, 133],
-                        "right_eye": [362, 386, 374, 263],
-                        "left_iris": [468, 469, 470, 471, 472],
-                        "right_iris": [473, 474, 475, 476, 477],
-                        "mouth": [13, 14, 291, 61],
-                    }
-
                     group_points = {}
                     for p in points:
                         pid = p.get("id")
@@ -2122,59 +2458,37 @@ class ImprovedWebcamProcessor:
                                         mesh_pts = mesh_pts[::step]
                                     for pt in mesh_pts:
                                         subdiv.insert(pt)
-                                    tris = subdiv.getTriangleList()
-                                    for t in tris:
-                                        xA, yA, xB, yB, xC, yC = [int(v) for v in t]
-                                        if (
-                                            x1 <= xA <= x2
-                                            and x1 <= xB <= x2
-                                            and x1 <= xC <= x2
-                                            and y1 <= yA <= y2
-                                            and y1 <= yB <= y2
-                                            and y1 <= yC <= y2
-                                        ):
-                                            cv2.line(
-                                                overlay,
-                                                (xA, yA),
-                                                (xB, yB),
-                                                (0, 255, 0),
-                                                1,
-                                            )
-                                            cv2.line(
-                                                overlay,
-                                                (xB, yB),
-                                                (xC, yC),
-                                                (0, 255, 0),
-                                                1,
-                                            )
-                                            cv2.line(
-                                                overlay,
-                                                (xC, yC),
-                                                (xA, yA),
-                                                (0, 255, 0),
-                                                1,
-                                            )
+                                    # Filter and draw every triangle in one
+                                    # polylines call instead of 3 lines each
+                                    tris = (
+                                        subdiv.getTriangleList()
+                                        .astype(np.int32)
+                                        .reshape(-1, 3, 2)
+                                    )
+                                    tx = tris[:, :, 0]
+                                    ty = tris[:, :, 1]
+                                    inside = (
+                                        (tx >= x1) & (tx <= x2) & (ty >= y1) & (ty <= y2)
+                                    ).all(axis=1)
+                                    if inside.any():
+                                        cv2.polylines(
+                                            overlay,
+                                            tris[inside],
+                                            isClosed=True,
+                                            color=(0, 255, 0),
+                                            thickness=1,
+                                        )
                             except Exception:
                                 pass
 
-                    group_colors = {
-                        "mesh": (0, 255, 0),
-                        "left_eye": (255, 255, 0),
-                        "right_eye": (255, 255, 0),
-                        "left_iris": (200, 200, 0),
-                        "right_iris": (200, 200, 0),
-                        "nose": (255, 255, 255),
-                        "mouth": (255, 0, 255),
-                    }
-
                     for group, pts in group_points.items():
-                        color = group_colors.get(group, (255, 255, 255))
+                        color = OVERLAY_GROUP_COLORS.get(group, (255, 255, 255))
                         for _pid, x, y in pts:
                             if 0 <= x < w and 0 <= y < h:
                                 r = 2 if group == "mesh" else 1
                                 cv2.circle(overlay, (x, y), r, color, -1)
 
-                        order = groups_order.get(group)
+                        order = OVERLAY_GROUP_ORDER.get(group)
                         if order:
                             by_idx = {}
                             for pid, x, y in pts:
@@ -2198,24 +2512,41 @@ class ImprovedWebcamProcessor:
 
         return
 
+    def _encode_jpeg(self, frame):
+        """Encode a BGR frame to JPEG bytes, preferring libjpeg-turbo"""
+        quality = int(self.jpeg_quality)
+        if self.jpeg_encoder is not None:
+            try:
+                return self.jpeg_encoder.encode(
+                    frame,
+                    quality=quality,
+                    pixel_format=TJPF_BGR,
+                    jpeg_subsample=TJSAMP_420,
+                )
+            except Exception as e:
+                logger.warning(
+                    f"[WARN] TurboJPEG encode failed, using OpenCV from now on: {e}"
+                )
+                self.jpeg_encoder = None
+
+        # Use lower JPEG quality to reduce size
+        ret_encode, buffer = cv2.imencode(
+            ".jpg",
+            frame,
+            [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_OPTIMIZE, 0],
+        )
+        return buffer.tobytes() if ret_encode else None
+
     def _emit_frame(self, frame):
         """Emit frame to UI"""
         if self.socketio:
             try:
-                # Store current frame for VLM
-                self.current_frame = frame.copy()
-
-                # Use lower JPEG quality to reduce size
-                ret_encode, buffer = cv2.imencode(
-                    ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)]
-                )
+                jpeg_bytes = self._encode_jpeg(frame)
 
-                if ret_encode:
-                    frame_b64 = base64.b64encode(buffer).decode("utf-8")
-
-                    # Use stored socketio reference
+                if jpeg_bytes:
+                    # Raw JPEG bytes go out as a Socket.IO binary attachment
                     try:
-                        self.socketio.emit("frame_update", {"frame": frame_b64})
+                        self.socketio.emit("frame_update", {"frame": jpeg_bytes})
                     except TypeError as e:
                         logger.error(
                             f"[ERROR] SocketIO serialization error: {e} - check for numpy types in state"
@@ -2230,17 +2561,64 @@ class ImprovedWebcamProcessor:
         if not self.socketio:
             return
         now = time.time()
-        if (now - self.last_state_emit_time) < 0.2:
+        # Periodic emit, plus an immediate one on a meaningful edge so the UI
+        # never lags a status flip by a full interval
+        emit_key = (self.state.focus_status, bool(self.state.face_detected))
+        # Calibration samples gaze from the latest state every 100 ms in the
+        # browser, so no throttling while it runs
+        if (
+            emit_key == self._last_state_emit_key
+            and (now - self.last_state_emit_time) < self.state_emit_interval
+            and not self.state.calibration_in_progress
+        ):
             return
+        self._last_state_emit_key = emit_key
         self.last_state_emit_time = now
+
+        # Serialization and socket writes happen on the emitter thread, off
+        # the inference loop; emit inline when that thread is not running
+        event = getattr(self, "_state_emit_event", None)
+        if event is not None and self.running:
+            event.set()
+            return
+        self._send_state_update()
+
+    def _state_emit_loop(self):
+        """Send coalesced state_update events requested by the inference loop"""
+        while self.running:
+            if not self._state_emit_event.wait(timeout=0.5):
+                continue
+            self._state_emit_event.clear()
+            if self.running:
+                self._send_state_update()
+
+    def _send_state_update(self):
         try:
+            # to_dict() returns the same snapshot object until a field
+            # changes, so an unchanged pair means clients are already current
+            payload = (self.state.to_dict(), self.last_vlm_analysis)
+            last = self._last_sent_state
+            if last is not None and payload[0] is last[0] and payload[1] is last[1]:
+                return
+            self._last_sent_state = payload
             self.socketio.emit(
                 "state_update",
-                {"state": self.state.to_dict(), "vlm_insights": self.last_vlm_analysis},
+                {"state": payload[0], "vlm_insights": payload[1]},
             )
         except Exception as e:
             logger.error(f"[ERROR] SocketIO state emit error: {e}")
 
+    def add_client(self, sid):
+        with self.lock:
+            self._clients.add(sid)
+
+    def remove_client(self, sid):
+        with self.lock:
+            self._clients.discard(sid)
+
+    def has_clients(self) -> bool:
+        return bool(self._clients)
+
     def toggle_processing(self):
         """Toggle privacy mode"""
         if not config.privacy_allow_pause:
@@ -2254,14 +2632,18 @@ class ImprovedWebcamProcessor:
 
     def get_overlay_settings(self):
         with self.lock:
-            return {
-                "visual_feedback_enabled": bool(self.visual_feedback_enabled),
-                "show_face_mesh": bool(self.face_mesh_overlay_enabled),
-                "face_mesh_alpha": float(self.face_mesh_overlay_alpha),
-                "face_mesh_smoothing": float(self.face_mesh_overlay_smoothing),
-                "face_mesh_mode": str(self.face_mesh_overlay_mode),
-                "face_mesh_stride": int(self.face_mesh_overlay_stride),
-            }
+            return self._overlay_settings_locked()
+
+    def _overlay_settings_locked(self):
+        """Overlay settings dict; the caller holds self.lock"""
+        return {
+            "visual_feedback_enabled": bool(self.visual_feedback_enabled),
+            "show_face_mesh": bool(self.face_mesh_overlay_enabled),
+            "face_mesh_alpha": float(self.face_mesh_overlay_alpha),
+            "face_mesh_smoothing": float(self.face_mesh_overlay_smoothing),
+            "face_mesh_mode": str(self.face_mesh_overlay_mode),
+            "face_mesh_stride": int(self.face_mesh_overlay_stride),
+        }
 
     def set_overlay_settings(
         self,
@@ -2299,3 +2681,6 @@ class ImprovedWebcamProcessor:
                     self.face_mesh_overlay_stride = int(face_mesh_stride)
                 except Exception:
                     pass
+
+            # Returned so callers need no second locked read
+            return self._overlay_settings_locked()
@@ -4,6 +4,7 @@ Handles facial landmark detection and analysis
 """
 
 import logging
+import math
 import numpy as np
 import mediapipe as mp
 from collections import deque
@@ -11,6 +12,16 @@ from typing import TypedDict
 
 logger = logging.getLogger(__name__)
 
+# Landmark indices exported as named overlay groups
+OVERLAY_GROUPS = {
+    "left_eye": (33, 159, 145, 133),
+    "right_eye": (362, 386, 374, 263),
+    "left_iris": (468, 469, 470, 471, 472),
+    "right_iris": (473, 474, 475, 476, 477),
+    "nose": (1,),
+    "mouth": (13, 14, 61, 291),
+}
+
 
 class _OverlayPoint(TypedDict):
     id: str
@@ -19,6 +30,107 @@ class _OverlayPoint(TypedDict):
     group: str
 
 
+# Landmarks the geometry kernel reads, in kernel row order; the two iris
+# centres come last so they can be dropped when iris refinement is off
+_GEOMETRY_LANDMARKS = (
+    33, 133, 159, 145,  # left eye: outer, inner, top, bottom
+    362, 263, 386, 374,  # right eye: inner, outer, top, bottom
+    13, 14, 61, 291,  # mouth: upper lip, lower lip, left, right corner
+    66, 296, 107, 336,  # eyebrows: left/right arch, left/right inner
+    1, 152,  # nose tip, chin
+    468, 473,  # left/right iris centre
+)
+
+
+def _geometry_points(landmarks):
+    """Pull the geometry landmarks as a list of (x, y) tuples
+
+    Only the ~20 points the geometry uses are read; touching all 478 pybind
+    proxies costs far more than the geometry itself.
+    """
+    lms = landmarks.landmark
+    idx = _GEOMETRY_LANDMARKS if len(lms) > 475 else _GEOMETRY_LANDMARKS[:-2]
+    return [(lms[i].x, lms[i].y) for i in idx]
+
+
+def _face_geometry(pts):
+    """Raw landmark geometry for one face from _geometry_points() output
+
+    Returns (ear, mar, eyebrow_raise, eyebrow_furrow, lip_width,
+    frown_degree, yaw, pitch, roll, avg_eye_width, raw_gaze_x, raw_gaze_y);
+    the last three are 0.0 without iris landmarks.
+    """
+    left_eye_left = pts[0][0]
+    left_eye_right = pts[1][0]
+    left_eye_top = pts[2][1]
+    left_eye_bottom = pts[3][1]
+    eye_horizontal = abs(left_eye_left - left_eye_right)
+    ear = 0.0
+    if eye_horizontal > 0:
+        ear = abs(left_eye_top - left_eye_bottom) / eye_horizontal
+
+    upper_lip = pts[8][1]
+    mouth_left = pts[10][0]
+    mouth_right = pts[11][0]
+    mouth_horizontal = abs(mouth_left - mouth_right)
+    mar = 0.0
+    if mouth_horizontal > 0:
+        mar = abs(upper_lip - pts[9][1]) / mouth_horizontal
+
+    right_eye_top = pts[6][1]
+    right_eye_bottom = pts[7][1]
+    left_eyebrow_dist = abs(pts[12][1] - (left_eye_top + left_eye_bottom) / 2)
+    right_eyebrow_dist = abs(pts[13][1] - (right_eye_top + right_eye_bottom) / 2)
+    eyebrow_raise = (left_eyebrow_dist + right_eyebrow_dist) / 2
+    eyebrow_furrow = abs(pts[14][0] - pts[15][0])
+
+    lip_width = abs(mouth_right - mouth_left)
+    lip_corners_avg_y = (pts[10][1] + pts[11][1]) / 2
+    frown_degree = (lip_corners_avg_y - upper_lip) * 100
+
+    left_eye_x = pts[0][0]
+    left_eye_y = pts[0][1]
+    right_eye_x = pts[5][0]
+    right_eye_y = pts[5][1]
+    yaw = (pts[16][0] - (left_eye_x + right_eye_x) / 2) * 90
+    pitch = (pts[16][1] - pts[17][1]) * 60
+    roll = math.atan2(left_eye_y - right_eye_y, right_eye_x - left_eye_x) * 180 / math.pi
+
+    avg_eye_width = 0.0
+    raw_gaze_x = 0.0
+    raw_gaze_y = 0.0
+    if len(pts) > 19:
+        # Iris landmarks give the gaze offset inside the eye opening
+        avg_iris_x = (pts[18][0] + pts[19][0]) / 2
+        avg_iris_y = (pts[18][1] + pts[19][1]) / 2
+        left_eye_width = left_eye_right - left_eye_left
+        right_eye_width = right_eye_x - pts[4][0]
+        avg_eye_width = (left_eye_width + right_eye_width) / 2
+
+        avg_eye_top = (left_eye_top + right_eye_top) / 2
+        avg_eye_height = (left_eye_bottom + right_eye_bottom) / 2 - avg_eye_top
+        face_center_x = (left_eye_left + right_eye_x) / 2
+        if avg_eye_width > 0:
+            raw_gaze_x = (avg_iris_x - face_center_x) / (avg_eye_width * 2.5)
+        if avg_eye_height > 0:
+            raw_gaze_y = (avg_iris_y - avg_eye_top) / avg_eye_height - 0.5
+
+    return (
+        ear,
+        mar,
+        eyebrow_raise,
+        eyebrow_furrow,
+        lip_width,
+        frown_degree,
+        yaw,
+        pitch,
+        roll,
+        avg_eye_width,
+        raw_gaze_x,
+        raw_gaze_y,
+    )
+
+
 class FaceMeshProcessor:
     """Processes facial landmarks and micro-expressions"""
 
@@ -53,6 +165,7 @@ class FaceMeshProcessor:
 
         # Face stability tracking for selective processing
         self.face_stability_history = deque(maxlen=5)
+        self.mesh_stride = max(1, int(config.face_mesh_frame_stride))
 
         # Track last successful processing to avoid timestamp conflicts
         self.last_frame_timestamp = None
@@ -63,13 +176,15 @@ class FaceMeshProcessor:
 
         logger.info("[OK] FaceMeshProcessor initialized")
 
-    def process(self, rgb_frame, state):
+    def process(self, rgb_frame, state, frame_size=None):
         """
         Process frame for face detection and landmark extraction
 
         Args:
             rgb_frame: RGB image frame
             state: SessionState object to update
+            frame_size: Optional (width, height) of the display frame, used
+                for overlay coordinates when rgb_frame is a downscaled copy
 
         Returns:
             dict: Face metrics including EAR, MAR, head pose, eye gaze, etc.
@@ -84,6 +199,9 @@ class FaceMeshProcessor:
             logger.warning(f"Invalid frame dimensions: {rgb_frame.shape}")
             return {"face_detected": False, "face_count": 0}
 
+        if frame_size is None:
+            frame_size = (rgb_frame.shape[1], rgb_frame.shape[0])
+
         try:
             # Check if we need to reinitialize due to too many errors
             if self.consecutive_errors >= self.max_consecutive_errors:
@@ -123,7 +241,7 @@ class FaceMeshProcessor:
                             landmarks = face_results.multi_face_landmarks[0]
                             metrics.update(self._extract_face_metrics(landmarks, state))
                             try:
-                                h, w = rgb_frame.shape[:2]
+                                w, h = frame_size
                                 mode = str(
                                     getattr(state, "face_mesh_overlay_mode", None)
                                     or "full"
@@ -157,7 +275,7 @@ class FaceMeshProcessor:
 
                         now = time.time()
                         if (now - float(self.last_face_landmarks_time or 0.0)) <= 0.6:
-                            h, w = rgb_frame.shape[:2]
+                            w, h = frame_size
                             mode = str(
                                 getattr(state, "face_mesh_overlay_mode", None) or "full"
                             ).strip()
@@ -223,7 +341,7 @@ class FaceMeshProcessor:
             return True  # Always process if disabled
 
         frame_count = getattr(state, "frame_count", 0) if state is not None else 0
-        if frame_count % 2 == 0:
+        if frame_count % self.mesh_stride == 0:
             return True
 
         if len(self.face_stability_history) < 3:
@@ -237,15 +355,6 @@ class FaceMeshProcessor:
     def _extract_overlay_points(
         self, landmarks, frame_w: int, frame_h: int, *, mode: str, stride: int
     ):
-        groups = {
-            "left_eye": [33, 159, 145, 133],
-            "right_eye": [362, 386, 374, 263],
-            "left_iris": [468, 469, 470, 471, 472],
-            "right_iris": [473, 474, 475, 476, 477],
-            "nose": [1],
-            "mouth": [13, 14, 61, 291],
-        }
-
         points: list[_OverlayPoint] = []
         mode = (mode or "").strip().lower()
         if mode in ("full", "mesh", "facemesh", "triangles", "triangle"):
@@ -257,7 +366,7 @@ class FaceMeshProcessor:
                 y = int(float(lm.y) * frame_h)
                 points.append({"id": f"mesh:{idx}", "x": x, "y": y, "group": "mesh"})
 
-        for group, idxs in groups.items():
+        for group, idxs in OVERLAY_GROUPS.items():
             for idx in idxs:
                 lm = landmarks.landmark[idx]
                 x = int(float(lm.x) * frame_w)
@@ -296,8 +405,6 @@ class FaceMeshProcessor:
         metrics = {}
         eye_gaze_x = 0.0
         eye_gaze_y = 0.0
-        raw_gaze_x = 0.0
-        raw_gaze_y = 0.0
 
         # Ensure state attributes are properly initialized with numeric types
         if not hasattr(state, "blink_count"):
@@ -309,22 +416,26 @@ class FaceMeshProcessor:
         if not hasattr(state, "blink_rate"):
             state.blink_rate = 0
 
-        # ===== EYE ASPECT RATIO (EAR) =====
-        try:
-            left_eye_top = float(landmarks.landmark[159].y)
-            left_eye_bottom = float(landmarks.landmark[145].y)
-            left_eye_left = float(landmarks.landmark[33].x)
-            left_eye_right = float(landmarks.landmark[133].x)
+        # One pull of the used landmarks, then one pass over the raw geometry
+        # instead of going through a pybind proxy for every coordinate
+        pts = _geometry_points(landmarks)
+        (
+            ear,
+            mar,
+            eyebrow_raise,
+            eyebrow_furrow,
+            lip_width,
+            frown_degree,
+            yaw,
+            pitch,
+            roll,
+            avg_eye_width,
+            raw_gaze_x,
+            raw_gaze_y,
+        ) = _face_geometry(pts)
 
-            eye_vertical = abs(left_eye_top - left_eye_bottom)
-            eye_horizontal = abs(left_eye_left - left_eye_right)
-
-            ear = eye_vertical / eye_horizontal if eye_horizontal > 0 else 0
-            metrics["eye_aspect_ratio"] = min(ear, 1.0)
-        except (AttributeError, TypeError, ZeroDivisionError) as e:
-            logger.warning(f"Error calculating EAR: {e}")
-            metrics["eye_aspect_ratio"] = 0.0
-            ear = 0.0
+        # ===== EYE ASPECT RATIO (EAR) =====
+        metrics["eye_aspect_ratio"] = min(ear, 1.0)
 
         # ===== BLINK DETECTION =====
         blink_ear_threshold = self.config.get(
@@ -370,59 +481,16 @@ class FaceMeshProcessor:
         metrics["is_blinking"] = is_blinking
 
         # ===== MOUTH ASPECT RATIO (MAR) =====
-        upper_lip = landmarks.landmark[13].y
-        lower_lip = landmarks.landmark[14].y
-        mouth_left = landmarks.landmark[61].x
-        mouth_right = landmarks.landmark[291].x
-
-        mouth_vertical = abs(upper_lip - lower_lip)
-        mouth_horizontal = abs(mouth_left - mouth_right)
-
-        mar = mouth_vertical / mouth_horizontal if mouth_horizontal > 0 else 0
         metrics["mouth_aspect_ratio"] = min(mar, 1.0)
 
         # ===== EYEBROW ANALYSIS =====
-        left_eyebrow_top = landmarks.landmark[66].y
-        left_eye_center = (left_eye_top + left_eye_bottom) / 2
-        right_eyebrow_top = landmarks.landmark[296].y
-        right_eye_top = landmarks.landmark[386].y
-        right_eye_bottom = landmarks.landmark[374].y
-        right_eye_center = (right_eye_top + right_eye_bottom) / 2
-
-        left_eyebrow_dist = abs(left_eyebrow_top - left_eye_center)
-        right_eyebrow_dist = abs(right_eyebrow_top - right_eye_center)
-        eyebrow_raise = (left_eyebrow_dist + right_eyebrow_dist) / 2
         metrics["eyebrow_raise"] = float(np.clip(eyebrow_raise * 10, 0, 1))
-
-        left_inner_brow = landmarks.landmark[107].x
-        right_inner_brow = landmarks.landmark[336].x
-        eyebrow_furrow = abs(left_inner_brow - right_inner_brow)
         metrics["eyebrow_furrow"] = float(np.clip(eyebrow_furrow * 5, 0, 1))
 
         # ===== LIP TENSION & FROWN =====
-        lip_left_corner = landmarks.landmark[61]
-        lip_right_corner = landmarks.landmark[291]
-        upper_lip_center = landmarks.landmark[13]
-
-        lip_width = abs(lip_right_corner.x - lip_left_corner.x)
         metrics["lip_tension"] = float(min(lip_width * 2, 1.0))
-
-        lip_corners_avg_y = (lip_left_corner.y + lip_right_corner.y) / 2
-        mouth_center_y = upper_lip_center.y
-        frown_degree = (lip_corners_avg_y - mouth_center_y) * 100
         metrics["frown_degree"] = float(np.clip(frown_degree, -1, 1))
 
-        nose_tip = landmarks.landmark[1]
-        chin = landmarks.landmark[152]
-        left_eye = landmarks.landmark[33]
-        right_eye = landmarks.landmark[263]
-
-        eye_center_x = (left_eye.x + right_eye.x) / 2
-        yaw = (nose_tip.x - eye_center_x) * 90
-        pitch = (nose_tip.y - chin.y) * 60
-        eye_diff_y = left_eye.y - right_eye.y
-        roll = np.arctan2(eye_diff_y, right_eye.x - left_eye.x) * 180 / np.pi
-
         head_yaw = float(np.clip(yaw, -90, 90))
         head_pitch = float(np.clip(pitch, -90, 90))
         head_roll = float(np.clip(roll, -90, 90))
@@ -432,47 +500,10 @@ class FaceMeshProcessor:
         metrics["head_roll"] = head_roll
 
         # ===== EYE GAZE DIRECTION =====
-        if len(landmarks.landmark) > 475:
+        if len(pts) == len(_GEOMETRY_LANDMARKS):
             # Use iris landmarks for accurate gaze tracking
-            left_iris_center = landmarks.landmark[468]
-            right_iris_center = landmarks.landmark[473]
-
-            avg_iris_x = (left_iris_center.x + right_iris_center.x) / 2
-            avg_iris_y = (left_iris_center.y + right_iris_center.y) / 2
-
-            left_eye_outer = landmarks.landmark[33].x
-            left_eye_inner = landmarks.landmark[133].x
-            right_eye_inner = landmarks.landmark[362].x
-            right_eye_outer = landmarks.landmark[263].x
-
-            left_eye_width = left_eye_inner - left_eye_outer
-            right_eye_width = right_eye_outer - right_eye_inner
-            avg_eye_width = (left_eye_width + right_eye_width) / 2
             metrics["face_scale"] = float(max(0.0, min(1.0, float(avg_eye_width))))
 
-            left_eye_top_v = landmarks.landmark[159].y
-            left_eye_bottom_v = landmarks.landmark[145].y
-            right_eye_top_v = landmarks.landmark[386].y
-            right_eye_bottom_v = landmarks.landmark[374].y
-
-            avg_eye_top = (left_eye_top_v + right_eye_top_v) / 2
-            avg_eye_bottom = (left_eye_bottom_v + right_eye_bottom_v) / 2
-            avg_eye_height = avg_eye_bottom - avg_eye_top
-
-            face_center_x = (left_eye_outer + right_eye_outer) / 2
-
-            # Calculate raw gaze (before calibration)
-            raw_gaze_x = (
-                (avg_iris_x - face_center_x) / (avg_eye_width * 2.5)
-                if avg_eye_width > 0
-                else 0.0
-            )
-            raw_gaze_y = (
-                (avg_iris_y - avg_eye_top) / avg_eye_height - 0.5
-                if avg_eye_height > 0
-                else 0.0
-            )
-
             if bool(self.config.get("eye_tracking", "invert_y", default=False)):
                 raw_gaze_y = -raw_gaze_y
 
@@ -44,15 +44,13 @@ def main():
 
     try:
         # Import and run the Flask app
-        from app import app, socketio
+        from app import serve
 
-        # Start the server
+        # Start the server (warms up the models first)
         port = int(os.getenv("PORT", 8080))
         logger.info(f"[WEB] Starting Eaglearn Application on http://localhost:{port}")
 
-        socketio.run(
-            app, host="0.0.0.0", port=port, debug=False, allow_unsafe_werkzeug=True
-        )
+        serve(port=port, debug=False)
 
     except ImportError as e:
         logger.error(f"[ERROR] Failed to import application modules: {e}")
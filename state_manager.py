@@ -14,6 +14,9 @@ class SessionState:
     """Main state container for the application"""
 
     def __init__(self):
+        # to_dict() snapshot, rebuilt only after a public attribute changes
+        self._cached_dict = None
+        self._dict_dirty = True
         self.lock = Lock()
 
         # Session info
@@ -127,6 +130,11 @@ class SessionState:
         self.last_focus_status = None
         self.rule_metrics = {}
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if not name.startswith("_"):
+            object.__setattr__(self, "_dict_dirty", True)
+
     def _format_time(self, seconds):
         """Format seconds to HH:MM:SS"""
         seconds = int(seconds)
@@ -161,14 +169,30 @@ class SessionState:
                         continue
             return out
 
+        # Lock-free fast path: the snapshot copies the containers writers
+        # mutate in place (rule_metrics is only ever replaced), so handing
+        # out the reference is safe without blocking writers. In-place
+        # mutations do not dirty the cache by themselves
+        if not self._dict_dirty:
+            snapshot = self._cached_dict
+            if snapshot is not None:
+                return snapshot
+
         with self.lock:
+            if not self._dict_dirty and self._cached_dict is not None:
+                return self._cached_dict
+            # Hide the old snapshot, then clear the flag before building so
+            # a concurrent write re-dirties the cache
+            self._cached_dict = None
+            self._dict_dirty = False
+
             # Debug log for zero stats issue
             if self.frame_count % 100 == 0 and self.frame_count > 0:
                 logger.info(
                     f"State dump - Frame: {self.frame_count}, Focus: {self.focus_percentage}%, FPS: {self.fps}"
                 )
 
-            return {
+            snapshot = {
                 "session_id": self.session_id,
                 "session_start_time": self.session_start_time,
                 "is_running": self.is_running,
@@ -259,14 +283,15 @@ class SessionState:
                     "first_unfocus_time": self.first_unfocus_time,
                     "last_unfocus_time": self.last_unfocus_time,
                     "intervals_count": len(self.unfocus_intervals),
-                    "recent_intervals": self.unfocus_intervals[-5:]
-                    if len(self.unfocus_intervals) > 5
-                    else self.unfocus_intervals,
+                    # Always a copy: the processor appends to the live list
+                    "recent_intervals": self.unfocus_intervals[-5:],
                 },
                 "rule_metrics": self.rule_metrics
                 if isinstance(self.rule_metrics, dict)
                 else {},
             }
+            self._cached_dict = snapshot
+            return snapshot
 
 
 # Create a global singleton instance
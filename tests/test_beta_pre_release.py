@@ -61,3 +61,36 @@ def test_forced_unfocused_when_distraction_active():
     score, status = p._stabilize_focus(90.0, "focused")
     assert status == "unfocused"
     assert score <= 30.0
+
+
+def test_invalid_json_field_is_a_bad_request():
+    import app as app_module
+
+    app_module.app.testing = True
+    client = app_module.app.test_client()
+
+    r = client.post(
+        "/api/calibration/add-point",
+        json={"screen_x": 10, "screen_y": 20, "gaze_x": "left", "gaze_y": 0.1},
+    )
+    assert r.status_code == 400
+    data = r.get_json()
+    assert data.get("error_code") == "BAD_REQUEST"
+    assert "gaze_x" in data.get("message", "")
+
+
+def test_oversized_body_rejected_with_413():
+    import app as app_module
+
+    app_module.app.testing = True
+    client = app_module.app.test_client()
+
+    limit = app_module.app.config["MAX_CONTENT_LENGTH"]
+    body = '{"screen_x": "' + "a" * limit + '"}'
+    r = client.post(
+        "/api/calibration/add-point", data=body, content_type="application/json"
+    )
+    assert r.status_code == 413
+    data = r.get_json()
+    assert data.get("status") == "error"
+    assert data.get("error_code") == "PAYLOAD_TOO_LARGE"
@@ -0,0 +1,255 @@
+from collections import deque
+
+
+def test_face_mesh_runs_on_stride_frames_only_when_unstable():
+    from config_loader import config
+    from state_manager import SessionState
+    from mediapipe_processors.face_mesh_processor import FaceMeshProcessor
+
+    p = FaceMeshProcessor.__new__(FaceMeshProcessor)
+    p.config = config
+    p.mesh_stride = 3
+    p.face_stability_history = deque([0.0, 0.0, 0.0], maxlen=5)
+
+    s = SessionState()
+    s.force_face_mesh = False
+    s.frame_count = 3
+    assert p._should_process_face_mesh(s) is True
+    s.frame_count = 4
+    assert p._should_process_face_mesh(s) is False
+
+
+class _RecordingSocket:
+    def __init__(self):
+        self.events = []
+
+    def emit(self, event, payload=None, **kwargs):
+        self.events.append((event, payload))
+
+
+def _bare_processor(state):
+    """Processor with only the fields the state-emit path reads"""
+    from threading import Event
+    from improved_webcam_processor import ImprovedWebcamProcessor
+
+    p = ImprovedWebcamProcessor.__new__(ImprovedWebcamProcessor)
+    p.state = state
+    p.socketio = _RecordingSocket()
+    p.running = False
+    p.last_state_emit_time = 0.0
+    p.state_emit_interval = 60.0
+    p._last_state_emit_key = None
+    p._state_emit_event = Event()
+    p._last_sent_state = None
+    p.last_vlm_analysis = None
+    return p
+
+
+def test_state_update_throttled_but_emits_on_focus_edge():
+    from state_manager import SessionState
+
+    s = SessionState()
+    p = _bare_processor(s)
+
+    p._emit_state_update()
+    p._emit_state_update()
+    assert len(p.socketio.events) == 1
+
+    s.focus_status = "focused"
+    p._emit_state_update()
+    assert len(p.socketio.events) == 2
+    assert p.socketio.events[-1][0] == "state_update"
+
+
+def test_state_update_not_throttled_during_calibration():
+    from state_manager import SessionState
+
+    s = SessionState()
+    s.calibration_in_progress = True
+    p = _bare_processor(s)
+
+    p._emit_state_update()
+    s.frame_count = 1
+    p._emit_state_update()
+    assert len(p.socketio.events) == 2
+
+
+def test_state_to_dict_is_cached_until_a_field_changes():
+    from state_manager import SessionState
+
+    s = SessionState()
+    first = s.to_dict()
+    assert s.to_dict() is first
+
+    s.focus_percentage = 42.0
+    second = s.to_dict()
+    assert second is not first
+    assert second["focus_percentage"] == 42.0
+
+
+def test_clean_state_snapshot_is_read_without_the_lock():
+    from state_manager import SessionState
+
+    from threading import Thread
+
+    s = SessionState()
+    first = s.to_dict()
+    result = []
+    # Read from another thread so a regression fails instead of deadlocking
+    reader = Thread(target=lambda: result.append(s.to_dict()), daemon=True)
+    with s.lock:
+        reader.start()
+        reader.join(timeout=1.0)
+        assert not reader.is_alive()
+    assert result[0] is first
+
+
+def test_state_updates_coalesce_onto_the_emitter_thread():
+    import time
+    from threading import Thread
+    from state_manager import SessionState
+
+    s = SessionState()
+    p = _bare_processor(s)
+    p.running = True
+
+    p._emit_state_update()
+    s.focus_status = "focused"
+    p._emit_state_update()
+    assert p.socketio.events == []
+
+    worker = Thread(target=p._state_emit_loop, daemon=True)
+    worker.start()
+    deadline = time.time() + 2.0
+    while not p.socketio.events and time.time() < deadline:
+        time.sleep(0.01)
+    p.running = False
+    p._state_emit_event.set()
+    worker.join(timeout=2.0)
+
+    assert len(p.socketio.events) == 1
+    assert p.socketio.events[0][1]["state"]["focus_status"] == "focused"
+
+
+def test_unfocus_analytics_recomputed_only_when_an_interval_closes():
+    import time
+    from state_manager import SessionState
+    from improved_webcam_processor import ImprovedWebcamProcessor
+
+    s = SessionState()
+    s.session_start_time = time.time() - 60.0
+    s.first_unfocus_time = s.session_start_time + 10.0
+    s.unfocus_intervals = [
+        {"start": 1.0, "end": 3.0, "duration": 2.0, "reason": "distracted"},
+        {"start": 5.0, "end": 9.0, "duration": 4.0, "reason": "distracted"},
+    ]
+    s.unfocus_count = 2
+    p = ImprovedWebcamProcessor.__new__(ImprovedWebcamProcessor)
+    p.state = s
+
+    first = p.calculate_unfocus_analytics()
+    assert first["avg_duration"] == 3.0
+    assert first["max_duration"] == 4.0
+    assert first["common_reasons"] == [{"reason": "distracted", "count": 2}]
+    assert round(first["time_to_first_unfocus"]) == 10
+    assert p.calculate_unfocus_analytics()["recent_intervals"] is first[
+        "recent_intervals"
+    ]
+
+    stale = p._unfocus_analytics_cache
+    s.unfocus_intervals.append(
+        {"start": 10.0, "end": 11.0, "duration": 1.0, "reason": "unknown"}
+    )
+    s.unfocus_count = 3
+    assert p.calculate_unfocus_analytics()["min_duration"] == 1.0
+    assert p.calculate_unfocus_analytics()["total_duration"] == 7.0
+
+    # A concurrent request that read the older cache folds the same interval
+    # again; the shared base totals must not be counted twice
+    p._unfocus_analytics_cache = stale
+    again = p.calculate_unfocus_analytics()
+    assert again["total_duration"] == 7.0
+    assert again["common_reasons"][0] == {"reason": "distracted", "count": 2}
+
+    # A new session swaps in a fresh list; the running totals start over
+    s.unfocus_intervals = [
+        {"start": 1.0, "end": 6.0, "duration": 5.0, "reason": "unknown"}
+    ]
+    s.unfocus_count = 1
+    fresh = p.calculate_unfocus_analytics()
+    assert fresh["total_duration"] == 5.0
+    assert fresh["max_duration"] == 5.0
+    assert fresh["common_reasons"] == [{"reason": "unknown", "count": 1}]
+
+
+def test_state_update_skipped_when_snapshot_unchanged():
+    from state_manager import SessionState
+
+    s = SessionState()
+    p = _bare_processor(s)
+
+    p._send_state_update()
+    p._send_state_update()
+    assert len(p.socketio.events) == 1
+
+    s.focus_status = "focused"
+    p._send_state_update()
+    assert len(p.socketio.events) == 2
+
+
+def test_bulk_calibration_points_match_single_adds():
+    import numpy as np
+    from config_loader import config
+    from calibration import CalibrationManager
+
+    rng = np.random.default_rng(0)
+    screens = rng.integers(0, 1920, size=(40, 2))
+    gazes = rng.uniform(-1.0, 1.0, size=(40, 2))
+
+    single = CalibrationManager(config)
+    single.start_calibration()
+    for (sx, sy), (gx, gy) in zip(screens, gazes):
+        single.add_calibration_point(int(sx), int(sy), float(gx), float(gy))
+
+    bulk = CalibrationManager(config)
+    bulk.start_calibration()
+    bulk.add_calibration_points(screens[:25], gazes[:25])
+    bulk.add_calibration_points(screens[25:], gazes[25:])
+    assert bulk.num_points == 40
+
+    a = single.calculate_calibration(save=False)
+    b = bulk.calculate_calibration(save=False)
+    for key in ("gaze_offset_x", "gaze_offset_y", "scale_factor", "num_points"):
+        assert np.isclose(a[key], b[key])
+    assert np.allclose(a["screen_mapping"]["x"], b["screen_mapping"]["x"])
+
+
+def test_smartphone_detections_decoded_and_sorted_by_score():
+    import numpy as np
+    from cv_modules.smartphone_detector import SmartphoneDetector
+
+    class _Net:
+        def __init__(self, out):
+            self.out = out
+
+        def setInput(self, blob):
+            pass
+
+        def forward(self):
+            return self.out
+
+    rows = np.zeros((1, 3, 7), dtype=np.float32)
+    rows[0, 0] = (320, 320, 64, 64, 0.9, 0.1, 0.8)  # class 1, score 0.72
+    rows[0, 1] = (100, 100, 20, 20, 0.3, 0.9, 0.1)  # below threshold
+    rows[0, 2] = (600, 50, 100, 40, 1.0, 0.95, 0.2)  # class 0, score 0.95
+
+    d = SmartphoneDetector.__new__(SmartphoneDetector)
+    d.ready = True
+    d.session = None
+    d.net = _Net(rows)
+    d.score_threshold = 0.5
+
+    found = d.detect(np.zeros((480, 640, 3), dtype=np.uint8))
+    assert [f["class_id"] for f in found] == [0, 1]
+    assert found[0]["bbox"] == (550, 22, 639, 52)
+    assert found[1]["bbox"] == (288, 216, 352, 264)
@@ -12,3 +12,23 @@ def test_environment_includes_vlm_status():
     assert isinstance(data["vlm_status"], dict)
     assert "status" in data["vlm_status"]
     assert "ready" in data["vlm_status"]
+
+
+def test_environment_probes_cached_until_refresh(monkeypatch):
+    import app as app_module
+
+    calls = []
+
+    def fake_probe():
+        calls.append(1)
+        return {"torch_cuda_available": False}
+
+    monkeypatch.setattr(app_module, "_probe_environment", fake_probe)
+    monkeypatch.setattr(app_module, "_env_probe_cache", None)
+
+    first = app_module.get_environment_probes()
+    assert app_module.get_environment_probes() is first
+    assert len(calls) == 1
+
+    app_module.get_environment_probes(refresh=True)
+    assert len(calls) == 2